@@ -8,12 +8,17 @@ from src.client.graphics.game_renderer import GameRenderer
 from src.client.input.input_manager import InputManager
 from src.client.ui.main_menu import MainMenu
 from src.server.game_logic.multiplayer_game import MultiplayerGame
+from src.network.net_log import configure_logging
+from src.common.utils.assets import assets
 from src.config.settings import FPS
 
 def main():
+    configure_logging()
     pygame.init()
     
     renderer = GameRenderer()
+    # Decode and convert everything the match needs once, now that the display exists
+    assets.preload()
     input_manager = InputManager()
     main_menu = MainMenu(renderer.screen)
     
@@ -98,7 +103,7 @@ def main():
                 else:
                     game.update()
                     game_mode = getattr(game, 'mode', None)
-                    renderer.render_frame(game.game_state, game.get_pause_menu(), game_mode)
+                    renderer.render_frame(game.game_state, game.get_pause_menu(), game_mode, game.get_network_overlay())
         
         renderer.tick(FPS)
     
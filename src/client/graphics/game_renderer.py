@@ -14,7 +14,7 @@ class GameRenderer:
             'large': pygame.font.SysFont(None, 48)
         }
         
-    def render_frame(self, game_state, pause_menu=None, game_mode=None):
+    def render_frame(self, game_state, pause_menu=None, game_mode=None, network_overlay=None):
         self.clear_screen()
         
         if game_state.current_state == GameStateType.MENU:
@@ -31,11 +31,25 @@ class GameRenderer:
         elif game_state.current_state == GameStateType.WAITING:
             self._render_gameplay(game_state)
             
+        if network_overlay:
+            self._render_network_overlay(network_overlay)
         self.present()
         
     def clear_screen(self):
         self.screen.fill(BLACK)
         
+    def _render_network_overlay(self, lines):
+        surfaces = [self.fonts['small'].render(line, True, WHITE) for line in lines]
+        width = max(surface.get_width() for surface in surfaces) + 16
+        height = sum(surface.get_height() for surface in surfaces) + 16
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        y = 8
+        for surface in surfaces:
+            panel.blit(surface, (8, y))
+            y += surface.get_height()
+        self.screen.blit(panel, (SCREEN_WIDTH - width - 10, 50))
+        
     def _render_menu(self):
         title_text = self.fonts['large'].render("DUEL GAME", True, WHITE)
         start_text = self.fonts['medium'].render("Press SPACE to start", True, WHITE)
@@ -55,6 +69,8 @@ class GameRenderer:
             
         for projectile in game_state.projectiles:
             projectile.draw(self.screen)
+        if game_state.projectile_system is not None:
+            game_state.projectile_system.draw(self.screen)
             
         self._render_ui(game_state)
         
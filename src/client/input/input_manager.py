@@ -16,7 +16,8 @@ class InputManager:
             'restart': pygame.K_r,
             'pause': pygame.K_p,
             'quit': pygame.K_ESCAPE,
-            'quit_to_menu': pygame.K_q
+            'quit_to_menu': pygame.K_q,
+            'network_overlay': pygame.K_F3
         }
         
     def process_input(self, game_state, controllable_player, events=None):
@@ -45,6 +46,8 @@ class InputManager:
             return {'type': 'quit'}
             
         if event.type == pygame.KEYDOWN:
+            if event.key == self.key_bindings['network_overlay']:
+                return {'type': 'toggle_network_overlay'}
             if game_state.current_state == GameStateType.GAME_OVER:
                 if event.key == self.key_bindings['restart']:
                     return {'type': 'restart'}
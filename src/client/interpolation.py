@@ -0,0 +1,92 @@
+from collections import deque
+from src.config.settings import (SNAPSHOT_BUFFER_SIZE, INTERPOLATION_DELAY_MIN, INTERPOLATION_DELAY_MAX,
+                                 INTERPOLATION_JITTER_FACTOR, INTERPOLATION_MAX_EXTRAPOLATION)
+
+
+def _blend(older, newer, t):
+    positions = {}
+    for key, (x, y) in newer.items():
+        start = older.get(key)
+        if start is None:
+            positions[key] = (x, y)
+        else:
+            positions[key] = (start[0] + (x - start[0]) * t, start[1] + (y - start[1]) * t)
+    return positions
+
+
+class SnapshotInterpolator:
+    """Jitter buffer for snapshot positions on the client.
+
+    Snapshots are stored with the host time they were taken at. The world is drawn
+    `delay` seconds behind the newest host time we can expect to have received, by
+    linearly interpolating between the two snapshots around that moment; if the buffer
+    runs dry it extrapolates from the last two for at most
+    INTERPOLATION_MAX_EXTRAPOLATION seconds. The delay is one snapshot interval plus a
+    multiple of the measured arrival jitter, so a quiet LAN runs at the minimum.
+    """
+
+    def __init__(self, size=SNAPSHOT_BUFFER_SIZE):
+        self.snapshots = deque(maxlen=size)
+        self.clock_offset = None
+        self.last_transit = None
+        self.jitter = 0.0
+        self.interval = INTERPOLATION_DELAY_MIN
+        self.delay = INTERPOLATION_DELAY_MIN
+
+    def add(self, server_time, arrival_time, players, projectiles):
+        """Buffer one snapshot; players and projectiles map id -> (x, y)."""
+        if self.snapshots and server_time <= self.snapshots[-1][0]:
+            return
+        transit = arrival_time - server_time
+        if self.last_transit is not None:
+            # RFC 3550 style running estimate of the variation in transit time
+            self.jitter += (abs(transit - self.last_transit) - self.jitter) / 16
+        self.last_transit = transit
+
+        # Track the fastest delivery seen; drift up slowly if the path gets slower
+        offset = server_time - arrival_time
+        if self.clock_offset is None or offset > self.clock_offset:
+            self.clock_offset = offset
+        else:
+            self.clock_offset += (offset - self.clock_offset) * 0.01
+
+        if self.snapshots:
+            self.interval += (server_time - self.snapshots[-1][0] - self.interval) * 0.1
+        self.delay = min(max(self.interval + INTERPOLATION_JITTER_FACTOR * self.jitter,
+                             INTERPOLATION_DELAY_MIN), INTERPOLATION_DELAY_MAX)
+        self.snapshots.append((server_time, players, projectiles))
+
+    def sample(self, current_time):
+        """Return (players, projectiles) positions to draw at current_time, or None if empty."""
+        if not self.snapshots:
+            return None
+        render_time = current_time + self.clock_offset - self.delay
+        newest = self.snapshots[-1]
+        if render_time >= newest[0]:
+            if len(self.snapshots) < 2:
+                return newest[1], newest[2]
+            older = self.snapshots[-2]
+            ahead = min(render_time - newest[0], INTERPOLATION_MAX_EXTRAPOLATION)
+            t = 1 + ahead / (newest[0] - older[0])
+            return _blend(older[1], newest[1], t), _blend(older[2], newest[2], t)
+        for index in range(len(self.snapshots) - 2, -1, -1):
+            older = self.snapshots[index]
+            if older[0] <= render_time:
+                newer = self.snapshots[index + 1]
+                t = (render_time - older[0]) / (newer[0] - older[0])
+                return _blend(older[1], newer[1], t), _blend(older[2], newer[2], t)
+        oldest = self.snapshots[0]
+        return oldest[1], oldest[2]
+
+    def view_lag(self, current_time):
+        """Seconds the drawn world is behind the newest buffered snapshot (0 if ahead or empty)."""
+        if not self.snapshots:
+            return 0.0
+        render_time = current_time + self.clock_offset - self.delay
+        return max(0.0, self.snapshots[-1][0] - render_time)
+
+    def clear(self):
+        self.snapshots.clear()
+        self.clock_offset = None
+        self.last_transit = None
+        self.jitter = 0.0
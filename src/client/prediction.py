@@ -0,0 +1,54 @@
+import math
+from collections import deque
+from src.network.input_commands import bits_direction, MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN
+from src.config.settings import PREDICTION_BUFFER_SIZE, PREDICTION_SNAP_DISTANCE, PREDICTION_CORRECTION
+
+
+class PlayerPredictor:
+    """Client-side prediction for the local player.
+
+    The player is moved locally every frame from the client's own input. Commands the
+    host has not yet acknowledged stay in a ring buffer; when a snapshot arrives the
+    player is rewound to the authoritative position and the pending commands are
+    replayed on top of it. Small corrections are blended in, large ones snap.
+    """
+
+    def __init__(self, player, game_map, command_interval, buffer_size=PREDICTION_BUFFER_SIZE):
+        self.player = player
+        self.game_map = game_map
+        self.command_interval = command_interval
+        self.pending = deque(maxlen=buffer_size)
+        self.last_command_time = None
+
+    def record(self, seq, buttons, current_time):
+        self.pending.append((seq, buttons))
+        self.last_command_time = current_time
+
+    def reconcile(self, x, y, acked_seq, current_time):
+        player = self.player
+        while self.pending and self.pending[0][0] <= acked_seq:
+            self.pending.popleft()
+
+        predicted_x, predicted_y = player.x, player.y
+        velocity = (player.velocity_x, player.velocity_y)
+        self._place(x, y)
+        for _, buttons in self.pending:
+            player.move(*bits_direction(buttons, MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN))
+            player.update(self.command_interval, self.game_map)
+        player.move(*velocity)
+        if self.pending and self.last_command_time is not None:
+            player.update(max(0.0, current_time - self.last_command_time), self.game_map)
+
+        if math.hypot(player.x - predicted_x, player.y - predicted_y) < PREDICTION_SNAP_DISTANCE:
+            self._place(predicted_x + (player.x - predicted_x) * PREDICTION_CORRECTION,
+                        predicted_y + (player.y - predicted_y) * PREDICTION_CORRECTION)
+
+    def reset(self, x, y):
+        self.pending.clear()
+        self._place(x, y)
+
+    def _place(self, x, y):
+        self.player.x = x
+        self.player.y = y
+        self.player.rect.x = int(x)
+        self.player.rect.y = int(y)
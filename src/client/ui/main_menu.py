@@ -19,9 +19,6 @@ class MainMenu:
         self.join_code_input = ""
         self.error_message = ""
         self.connection_result = None
-        self.ready_check_pending = False
-        self.ready_check_start_time = 0
-        self.ready_check_pending = False
         
         self.countdown_start_time = 0
         self.countdown_duration = 3.0
@@ -74,12 +71,9 @@ class MainMenu:
                     info = self.server.get_server_info()
                     if info['clients'] >= 2:
                         if self.client and self.client.is_connection_healthy():
-                            if not self.ready_check_pending:
-                                self.ready_check_pending = True
-                                self.ready_check_start_time = time.time()
-                                print("Sending ready check ping...")
-                                self.client.send_message({'type': 'ready_ping'})
-                                self.error_message = "Checking client connection..."
+                            # countdown_start is delivered reliably, so no ready check round trip is needed
+                            self.error_message = ""
+                            return self._start_countdown()
                         else:
                             self.error_message = "Connection lost - cannot start game"
         
@@ -152,7 +146,6 @@ class MainMenu:
                 self.client.register_handler('connection_lost', self._handle_host_connection_lost)
                 self.client.register_handler('connection_check_ok', self._handle_connection_check_ok)
                 self.client.register_handler('connection_check_failed', self._handle_connection_check_failed)
-                self.client.register_handler('ready_pong', self._handle_ready_pong)
                 self.client.disable_timeout_checking()
             else:
                 self.server.stop()
@@ -276,7 +269,6 @@ class MainMenu:
                     self.client.register_handler('player_disconnected', self._handle_player_disconnected_client)
                     self.client.register_handler('connection_check_ok', self._handle_connection_check_ok)
                     self.client.register_handler('connection_check_failed', self._handle_connection_check_failed)
-                    self.client.register_handler('ready_ping', self._handle_ready_ping)
                     self.client.enable_timeout_checking()
                     self.connection_result = 'connected'
                 else:
@@ -354,12 +346,6 @@ class MainMenu:
                         self.server.players_ready = False
                         self.server.game_state['game_status'] = 'waiting'
             self._last_client_count = info['clients']
-            
-            if self.ready_check_pending:
-                if time.time() - self.ready_check_start_time > 1.0:
-                    print("Ready check timeout - client not responding")
-                    self.ready_check_pending = False
-                    self.error_message = "Client not responding - check connection"
         
         if self.state == 'connecting' and self.connection_result:
             if self.connection_result == 'failed':
@@ -461,10 +447,6 @@ class MainMenu:
                 space_text = self.font_small.render("Press SPACE to begin", True, (0, 255, 0))
                 space_rect = space_text.get_rect(center=(SCREEN_WIDTH//2, 400))
                 self.screen.blit(space_text, space_rect)
-            elif self.ready_check_pending:
-                ready_text = self.font_medium.render("Checking client readiness...", True, (255, 255, 0))
-                ready_rect = ready_text.get_rect(center=(SCREEN_WIDTH//2, 380))
-                self.screen.blit(ready_text, ready_rect)
             elif info['clients'] >= 2:
                 ready_text = self.font_medium.render("Second player connected!", True, (0, 255, 0))
                 ready_rect = ready_text.get_rect(center=(SCREEN_WIDTH//2, 370))
@@ -582,17 +564,6 @@ class MainMenu:
         self.error_message = "Connection to server lost"
         self._reset_to_main_menu()
 
-    def _handle_ready_ping(self, message):
-        print("Received ready ping, sending pong...")
-        if self.client:
-            self.client.send_message({'type': 'ready_pong'})
-
-    def _handle_ready_pong(self, message):
-        print("Received ready pong - client is ready!")
-        self.ready_check_pending = False
-        self.error_message = ""
-        return self._start_countdown()
-
     def _reset_to_main_menu(self):
         if self.client:
             self.client.disconnect()
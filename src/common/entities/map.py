@@ -2,16 +2,25 @@ import pygame
 import random
 import math
 from src.common.entities.tile import Tile
+from src.common.utils.spatial_hash import cells_along, segment_entry
 from src.config.settings import TILE_SIZE, MAP_1, MIN_SPAWN_DISTANCE_FROM_WALLS, MIN_SPAWN_DISTANCE_FROM_ENEMY
 
+# Collision flags per tile in Map.collision
+SOLID = 1
+BLOCKS_PLAYER = 2
+
 class Map:
     def __init__(self, map_data=None):
         self.tiles = []
         self.walls = []
         self.spawn_points = {}
         self.map_data = map_data if map_data is not None else MAP_1
-        self.width = len(self.map_data[0]) if self.map_data else 0
-        self.height = len(self.map_data) if self.map_data else 0
+        self.width = max((len(row) for row in self.map_data), default=0)
+        self.height = len(self.map_data)
+        # Collision flags and tiles indexed by row * width + column, so a query only looks
+        # at the tiles under the rect it is given
+        self.collision = bytearray(self.width * self.height)
+        self.grid = [None] * (self.width * self.height)
         
         for row_idx, row in enumerate(self.map_data):
             for col_idx, cell in enumerate(row):
@@ -27,10 +36,72 @@ class Map:
                 
                 tile = Tile(x, y, cell)
                 self.tiles.append(tile)
+                index = row_idx * self.width + col_idx
+                self.grid[index] = tile
+                self.collision[index] = (SOLID if tile.is_solid else 0) | (BLOCKS_PLAYER if tile.blocks_player else 0)
                 
                 if cell in ['W', 'B']:
                     self.walls.append(tile)
     
+    def tiles_overlapping(self, rect, flags):
+        """Tiles with any of `flags` that overlap rect, row by row."""
+        left = max(0, rect.left // TILE_SIZE)
+        right = min(self.width - 1, (rect.right - 1) // TILE_SIZE)
+        top = max(0, rect.top // TILE_SIZE)
+        bottom = min(self.height - 1, (rect.bottom - 1) // TILE_SIZE)
+        collision = self.collision
+        for row in range(top, bottom + 1):
+            base = row * self.width
+            for index in range(base + left, base + right + 1):
+                if collision[index] & flags:
+                    yield self.grid[index]
+    
+    def first_collision(self, rect, flags):
+        """The first tile with any of `flags` that rect overlaps, or None."""
+        return next(self.tiles_overlapping(rect, flags), None)
+    
+    def sweep(self, x0, y0, x1, y1, half_size, flags):
+        """Earliest tile with any of `flags` hit by a square of half_size moving its centre
+        from (x0, y0) to (x1, y1), as (fraction of the move, tile), or None.
+
+        Short moves test the tiles under the swept box. Longer ones walk the tiles along
+        the centre line (DDA) and test each tile's neighbours, which cover the box as long
+        as half_size is under a tile.
+        """
+        low_x, high_x = (x0, x1) if x0 <= x1 else (x1, x0)
+        low_y, high_y = (y0, y1) if y0 <= y1 else (y1, y0)
+        left = int((low_x - half_size) // TILE_SIZE)
+        right = int((high_x + half_size) // TILE_SIZE)
+        top = int((low_y - half_size) // TILE_SIZE)
+        bottom = int((high_y + half_size) // TILE_SIZE)
+        if (right - left + 1) * (bottom - top + 1) <= 9:
+            # Tiles off the map are never solid, so the box is clipped to the grid
+            left, right = max(left, 0), min(right, self.width - 1)
+            width = self.width
+            indices = [index for row in range(max(top, 0), min(bottom, self.height - 1) + 1)
+                       for index in range(row * width + left, row * width + right + 1)]
+        else:
+            reach = int(half_size // TILE_SIZE) + 1
+            indices = [row * self.width + column for column, row in dict.fromkeys(
+                           (column + dc, row + dr)
+                           for column, row in cells_along(x0, y0, x1, y1, TILE_SIZE)
+                           for dr in range(-reach, reach + 1) for dc in range(-reach, reach + 1))
+                       if 0 <= column < self.width and 0 <= row < self.height]
+        best = None
+        collision = self.collision
+        for index in indices:
+            if collision[index] & flags:
+                tile = self.grid[index]
+                t = segment_entry(x0, y0, x1, y1, tile.rect, half_size)
+                if t is not None and (best is None or t < best[0]):
+                    best = (t, tile)
+        return best
+    
+    def tile_flags(self, tile_x, tile_y):
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            return self.collision[tile_y * self.width + tile_x]
+        return 0
+    
     def draw(self, screen):
         for tile in self.tiles:
             tile.draw(screen)
@@ -41,7 +112,7 @@ class Map:
         else:
             return (TILE_SIZE * 3, TILE_SIZE * 3)
     
-    def find_safe_spawn_position(self, enemy_player=None, max_attempts=100):
+    def find_safe_spawn_position(self, enemy_player=None, max_attempts=100, nearby_enemies=None):
         for _ in range(max_attempts):
             tile_x = random.randint(MIN_SPAWN_DISTANCE_FROM_WALLS, 
                                   self.width - MIN_SPAWN_DISTANCE_FROM_WALLS - 1)
@@ -51,12 +122,13 @@ class Map:
             x = tile_x * TILE_SIZE
             y = tile_y * TILE_SIZE
             
-            if self.is_safe_spawn_position(x, y, enemy_player):
+            enemies = nearby_enemies(x, y) if nearby_enemies else ()
+            if self.is_safe_spawn_position(x, y, enemy_player, enemies):
                 return (x, y)
         
         return (TILE_SIZE * 5, TILE_SIZE * 5)
     
-    def is_safe_spawn_position(self, x, y, enemy_player=None):
+    def is_safe_spawn_position(self, x, y, enemy_player=None, enemies=()):
         tile_x = x // TILE_SIZE
         tile_y = y // TILE_SIZE
         
@@ -64,20 +136,20 @@ class Map:
                            min(self.width, tile_x + MIN_SPAWN_DISTANCE_FROM_WALLS + 1)):
             for wall_y in range(max(0, tile_y - MIN_SPAWN_DISTANCE_FROM_WALLS),
                                min(self.height, tile_y + MIN_SPAWN_DISTANCE_FROM_WALLS + 1)):
-                if wall_y < len(self.map_data) and wall_x < len(self.map_data[wall_y]):
-                    if self.map_data[wall_y][wall_x] in ['W', 'B']:
-                        return False
+                if self.tile_flags(wall_x, wall_y) & BLOCKS_PLAYER:
+                    return False
         
-        if enemy_player and enemy_player.is_alive:
-            enemy_tile_x = enemy_player.rect.centerx // TILE_SIZE
-            enemy_tile_y = enemy_player.rect.centery // TILE_SIZE
+        for enemy in (enemy_player, *enemies):
+            if not enemy or not enemy.is_alive:
+                continue
+            enemy_tile_x = enemy.rect.centerx // TILE_SIZE
+            enemy_tile_y = enemy.rect.centery // TILE_SIZE
             
             distance = math.sqrt((tile_x - enemy_tile_x) ** 2 + (tile_y - enemy_tile_y) ** 2)
             if distance < MIN_SPAWN_DISTANCE_FROM_ENEMY:
                 return False
         
-        if tile_y < len(self.map_data) and tile_x < len(self.map_data[tile_y]):
-            if self.map_data[tile_y][tile_x] in ['W', 'B']:
-                return False
+        if self.tile_flags(tile_x, tile_y) & BLOCKS_PLAYER:
+            return False
         
         return True
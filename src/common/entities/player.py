@@ -2,6 +2,7 @@ import pygame
 import math
 from src.common.entities.entity import Entity
 from src.common.entities.projectile import Projectile
+from src.common.entities.map import BLOCKS_PLAYER
 from src.common.utils.helpers import load_image, get_direction_from_angle
 from src.config.settings import PLAYER_SPEED, FIRE_COOLDOWN, PLAYER_HEALTH, TILE_SIZE, RESPAWN_DELAY
 
@@ -35,7 +36,7 @@ class Player(Entity):
         self.velocity_x = 0
         self.velocity_y = 0
         
-    def update(self, dt, walls):
+    def update(self, dt, game_map):
         if not self.is_alive:
             return
             
@@ -49,32 +50,27 @@ class Player(Entity):
                 vel_x = self.velocity_x * self.speed * dt
                 vel_y = self.velocity_y * self.speed * dt
             
-            nearby_walls = [w for w in walls if abs(w.rect.x - self.rect.x) < 96 and 
-                             abs(w.rect.y - self.rect.y) < 96]
-            
             self.x += vel_x
             self.rect.x = int(self.x)
             
-            for wall in nearby_walls:
-                if wall.blocks_player and self.rect.colliderect(wall.rect):
-                    if self.velocity_x > 0:
-                        self.rect.right = wall.rect.left
-                    else:
-                        self.rect.left = wall.rect.right
-                    self.x = float(self.rect.x)
-                    break
+            wall = game_map.first_collision(self.rect, BLOCKS_PLAYER)
+            if wall:
+                if self.velocity_x > 0:
+                    self.rect.right = wall.rect.left
+                else:
+                    self.rect.left = wall.rect.right
+                self.x = float(self.rect.x)
             
             self.y += vel_y
             self.rect.y = int(self.y)
             
-            for wall in nearby_walls:
-                if wall.blocks_player and self.rect.colliderect(wall.rect):
-                    if self.velocity_y > 0:
-                        self.rect.bottom = wall.rect.top
-                    else:
-                        self.rect.top = wall.rect.bottom
-                    self.y = float(self.rect.y)
-                    break
+            wall = game_map.first_collision(self.rect, BLOCKS_PLAYER)
+            if wall:
+                if self.velocity_y > 0:
+                    self.rect.bottom = wall.rect.top
+                else:
+                    self.rect.top = wall.rect.bottom
+                self.y = float(self.rect.y)
         
         if not self.can_shoot:
             current_time = pygame.time.get_ticks()
@@ -133,7 +129,7 @@ class Player(Entity):
         self.rect = pygame.Rect(0, 0, 48, 48)
         self.rect.center = old_center
     
-    def shoot(self):
+    def shoot(self, play_sound=True):
         if not self.can_shoot or not self.is_alive:
             return None
             
@@ -144,7 +140,7 @@ class Player(Entity):
         direction_x, direction_y = get_direction_from_angle(self.angle)
         
         return Projectile(center_x, center_y, self.angle, self, 
-                         player_velocity=(self.velocity_x, self.velocity_y))
+                         player_velocity=(self.velocity_x, self.velocity_y), play_sound=play_sound)
     
     def take_damage(self, damage):
         if not self.is_alive:
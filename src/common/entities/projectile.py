@@ -1,12 +1,43 @@
 import pygame
 import math
 from src.common.entities.entity import Entity
+from src.common.entities.map import SOLID
+from src.common.utils.spatial_hash import segment_entry
 from src.common.utils.helpers import get_direction_from_angle, load_sound
 from src.config.settings import PROJECTILE_SPEED, PROJECTILE_LIFETIME, PROJECTILE_DAMAGE, TILE_SIZE, PLAYER_SPEED
 
+# Projectiles are HALF_SIZE * 2 pixels square
+HALF_SIZE = 3
+
+
+def first_hit(game_map, x0, y0, x1, y1, player_index, owner, hitboxes=None, rewind=0, current_time=0):
+    """What a projectile whose centre moves from (x0, y0) to (x1, y1) runs into first.
+
+    Returns (wall tile, None), (None, player) or (None, None). The projectile's square is
+    swept along the whole move, so a long step (a frame hitch) cannot pass through a wall
+    or a player. A player is tested at its hitbox `rewind` ms ago when hitboxes are kept.
+    """
+    hit = game_map.sweep(x0, y0, x1, y1, HALF_SIZE, SOLID)
+    first = hit[0] if hit else None
+    target = None
+    # A rewound hitbox can be up to PLAYER_SPEED * rewind behind where the index has the player
+    margin = HALF_SIZE + (int(PLAYER_SPEED * rewind / 1000) + 1 if rewind else 0)
+    for player in player_index.query_segment(x0, y0, x1, y1, margin):
+        if player is owner or not player.is_alive:
+            continue
+        hitbox = hitboxes.rect_at(player, current_time - rewind) if rewind else player.rect
+        t = segment_entry(x0, y0, x1, y1, hitbox, HALF_SIZE)
+        if t is not None and (first is None or t < first):
+            first = t
+            target = player
+    if target:
+        return None, target
+    return (hit[1] if hit else None), None
+
+
 class Projectile(Entity):
     def __init__(self, x, y, angle, owner, player_velocity=(0, 0), projectile_id=None, play_sound=True):
-        super().__init__(x, y, 6, 6)
+        super().__init__(x, y, HALF_SIZE * 2, HALF_SIZE * 2)
         
         self.angle = angle
         self.base_speed = PROJECTILE_SPEED
@@ -26,42 +57,37 @@ class Projectile(Entity):
         
         self.spawn_time = pygame.time.get_ticks()
         self.lifetime = PROJECTILE_LIFETIME
+        # Milliseconds to rewind player hitboxes by for lag compensation (0 = current positions)
+        self.rewind = 0
         
         if play_sound:
             self.sound = load_sound("shooting-sound-fx-159024.mp3")
             if self.sound:
                 self.sound.play()
     
-    def update(self, dt, walls, players):
+    def update(self, dt, game_map, player_index, hitboxes=None):
         current_time = pygame.time.get_ticks()
         if current_time - self.spawn_time > self.lifetime:
             return False
-            
+        
+        start_x, start_y = self.x + HALF_SIZE, self.y + HALF_SIZE
         self.x += self.vel_x * dt
         self.y += self.vel_y * dt
         self.rect.x = int(self.x)
         self.rect.y = int(self.y)
         
-        nearby_walls = [w for w in walls if abs(w.rect.x - self.rect.x) < 64 and 
-                         abs(w.rect.y - self.rect.y) < 64]
-        
-        for wall in nearby_walls:
-            if self.rect.colliderect(wall.rect):
-                if wall.is_solid:
-                    return False
-        
-        for player in players:
-            if player is not self.owner and player.is_alive and self.rect.colliderect(player.rect):
-                was_alive = player.is_alive
-                player.take_damage(self.damage)
-                
-                if was_alive and not player.is_alive and self.owner:
-                    from src.config.settings import POINTS_PER_ELIMINATION
-                    self.owner.add_score(POINTS_PER_ELIMINATION)
-                
-                return False
-        
-        return True
+        rewind = self.rewind if hitboxes is not None else 0
+        wall, player = first_hit(game_map, start_x, start_y, self.x + HALF_SIZE, self.y + HALF_SIZE,
+                                 player_index, self.owner, hitboxes, rewind, current_time)
+        if player:
+            self.hit(player)
+        return not (wall or player)
+    
+    def hit(self, player):
+        player.take_damage(self.damage)
+        if not player.is_alive and self.owner:
+            from src.config.settings import POINTS_PER_ELIMINATION
+            self.owner.add_score(POINTS_PER_ELIMINATION)
     
     def draw(self, screen):
         pygame.draw.circle(screen, (0, 0, 0), self.rect.center, 3)
@@ -0,0 +1,94 @@
+import os
+import pygame
+
+
+class AssetCache:
+    """Images and sounds loaded from disk once and shared by key.
+
+    Every Tile of a map and every shot then reuses the same Surface or Sound instead of
+    decoding the file again. Callers must treat the shared objects as read-only (copy a
+    surface before drawing on it). Images are converted for the display once one exists;
+    before that (e.g. on the headless dedicated server) they are kept unconverted. A file
+    that fails to load is remembered as failed so it is not retried every call.
+    """
+
+    def __init__(self):
+        self.images = {}
+        self.sounds = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, file_name, scale=1, convert_alpha=True):
+        display_ready = pygame.display.get_init() and pygame.display.get_surface() is not None
+        key = (file_name, scale, convert_alpha, display_ready)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+        image = self.images[key] = self._load_image(file_name, scale, convert_alpha, display_ready)
+        return image
+
+    def _load_image(self, file_name, scale, convert_alpha, display_ready):
+        from src.config.settings import IMAGE_DIR
+        
+        try:
+            img = pygame.image.load(os.path.join(IMAGE_DIR, file_name))
+            if display_ready:
+                img = img.convert_alpha() if convert_alpha else img.convert()
+            
+            if scale != 1:
+                w, h = img.get_size()
+                img = pygame.transform.scale(img, (int(w * scale), int(h * scale)))
+            return img
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error loading image {file_name}: {e}")
+            return pygame.Surface((32, 32))
+
+    def sound(self, file_name):
+        if file_name in self.sounds:
+            self.hits += 1
+            return self.sounds[file_name]
+        self.misses += 1
+        from src.config.settings import SOUND_DIR
+        
+        try:
+            sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, file_name))
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error loading sound {file_name}: {e}")
+            sound = None
+        self.sounds[file_name] = sound
+        return sound
+
+    def preload(self, manifest=None):
+        """Load every asset in a {'images': [...], 'sounds': [...]} manifest (ASSET_MANIFEST by default)."""
+        if manifest is None:
+            from src.config.settings import ASSET_MANIFEST
+            manifest = ASSET_MANIFEST
+        for file_name in manifest.get('images', ()):
+            self.image(file_name)
+        for file_name in manifest.get('sounds', ()):
+            self.sound(file_name)
+
+    def memory_usage(self):
+        """Approximate bytes held by cached pixel and sample data, with entry and lookup counts."""
+        image_bytes = sum(image.get_width() * image.get_height() * image.get_bytesize()
+                          for image in self.images.values())
+        sound_bytes = 0
+        mixer = pygame.mixer.get_init()
+        if mixer:
+            frequency, sample_format, channels = mixer
+            sample_bytes = channels * abs(sample_format) // 8
+            sound_bytes = sum(int(sound.get_length() * frequency) * sample_bytes
+                              for sound in self.sounds.values() if sound is not None)
+        return {'images': len(self.images), 'image_bytes': image_bytes,
+                'sounds': len(self.sounds), 'sound_bytes': sound_bytes,
+                'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        self.images.clear()
+        self.sounds.clear()
+
+
+# Shared by load_image / load_sound and everything that calls them
+assets = AssetCache()
@@ -1,34 +1,12 @@
 import math
 import pygame
-import os
+from src.common.utils.assets import assets
 
 def load_image(file_name, scale=1, convert_alpha=True):
-    from src.config.settings import IMAGE_DIR
-    
-    try:
-        path = os.path.join(IMAGE_DIR, file_name)
-        if convert_alpha:
-            img = pygame.image.load(path).convert_alpha()
-        else:
-            img = pygame.image.load(path).convert()
-        
-        if scale != 1:
-            w, h = img.get_size()
-            img = pygame.transform.scale(img, (int(w * scale), int(h * scale)))
-        return img
-    except pygame.error as e:
-        print(f"Error loading image {file_name}: {e}")
-        return pygame.Surface((32, 32))
+    return assets.image(file_name, scale, convert_alpha)
 
 def load_sound(file_name):
-    from src.config.settings import SOUND_DIR
-    
-    try:
-        path = os.path.join(SOUND_DIR, file_name)
-        return pygame.mixer.Sound(path)
-    except pygame.error as e:
-        print(f"Error loading sound {file_name}: {e}")
-        return None
+    return assets.sound(file_name)
 
 def calculate_angle(pos1, pos2):
     dx = pos2[0] - pos1[0]
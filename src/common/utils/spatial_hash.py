@@ -0,0 +1,155 @@
+import math
+
+
+def cells_along(x0, y0, x1, y1, cell_size):
+    """Grid cells (column, row) a segment passes through, in order from its start.
+
+    Steps from cell boundary to cell boundary (Amanatides-Woo), so the cost depends on
+    the segment's length in cells rather than on its bounding box.
+    """
+    column, row = int(x0 // cell_size), int(y0 // cell_size)
+    end_column, end_row = int(x1 // cell_size), int(y1 // cell_size)
+    dx, dy = x1 - x0, y1 - y0
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    # Segment parameter t (0..1) at the next vertical and horizontal boundary, and per cell
+    if dx:
+        boundary = (column + (step_x > 0)) * cell_size
+        t_max_x, t_delta_x = (boundary - x0) / dx, cell_size / abs(dx)
+    else:
+        t_max_x = t_delta_x = math.inf
+    if dy:
+        boundary = (row + (step_y > 0)) * cell_size
+        t_max_y, t_delta_y = (boundary - y0) / dy, cell_size / abs(dy)
+    else:
+        t_max_y = t_delta_y = math.inf
+    yield column, row
+    for _ in range(abs(end_column - column) + abs(end_row - row)):
+        if t_max_x < t_max_y:
+            column += step_x
+            t_max_x += t_delta_x
+        else:
+            row += step_y
+            t_max_y += t_delta_y
+        yield column, row
+
+
+class SpatialHash:
+    """Uniform grid over world space for finding entities near a rect or segment.
+
+    Each entity is filed under every cell its rect overlaps. sync() is called once per
+    tick with the current entities and only re-files those whose cell range changed, so
+    a tick where nothing crosses a cell boundary touches no buckets. Queries return
+    broad-phase candidates in the order they were passed to sync(); callers test the
+    exact shapes themselves (e.g. against rewound hitboxes).
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        # entity -> [cell range (left, top, right, bottom), order in the last sync]
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, entity):
+        return entity in self.entries
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def _file(self, entity, cell_range, add):
+        left, top, right, bottom = cell_range
+        cells = self.cells
+        for row in range(top, bottom + 1):
+            for column in range(left, right + 1):
+                if add:
+                    cells.setdefault((column, row), []).append(entity)
+                else:
+                    bucket = cells[(column, row)]
+                    bucket.remove(entity)
+                    if not bucket:
+                        del cells[(column, row)]
+
+    def sync(self, entities):
+        """Index exactly `entities` at their current rects, dropping any no longer present."""
+        stale = set(self.entries)
+        for order, entity in enumerate(entities):
+            cell_range = self._cell_range(entity.rect)
+            entry = self.entries.get(entity)
+            if entry is None:
+                self._file(entity, cell_range, True)
+                self.entries[entity] = [cell_range, order]
+                continue
+            stale.discard(entity)
+            if entry[0] != cell_range:
+                self._file(entity, entry[0], False)
+                self._file(entity, cell_range, True)
+                entry[0] = cell_range
+            entry[1] = order
+        for entity in stale:
+            self.remove(entity)
+
+    def remove(self, entity):
+        entry = self.entries.pop(entity, None)
+        if entry is not None:
+            self._file(entity, entry[0], False)
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+
+    def _ordered(self, found):
+        entries = self.entries
+        return sorted(found, key=lambda entity: entries[entity][1])
+
+    def query_rect(self, rect, margin=0):
+        """Entities filed in the cells within `margin` pixels of rect."""
+        size = self.cell_size
+        cells = self.cells
+        found = set()
+        for row in range((rect.top - margin) // size, (rect.bottom - 1 + margin) // size + 1):
+            for column in range((rect.left - margin) // size, (rect.right - 1 + margin) // size + 1):
+                bucket = cells.get((column, row))
+                if bucket:
+                    found.update(bucket)
+        return self._ordered(found)
+
+    def query_segment(self, x0, y0, x1, y1, margin=0):
+        """Entities filed in the cells the segment crosses, widened by `margin` pixels."""
+        reach = int(math.ceil(margin / self.cell_size))
+        cells = self.cells
+        found = set()
+        for column, row in cells_along(x0, y0, x1, y1, self.cell_size):
+            for near_row in range(row - reach, row + reach + 1):
+                for near_column in range(column - reach, column + reach + 1):
+                    bucket = cells.get((near_column, near_row))
+                    if bucket:
+                        found.update(bucket)
+        return self._ordered(found)
+
+
+def segment_entry(x0, y0, x1, y1, rect, pad=0):
+    """Fraction (0..1) of the segment at which it first enters rect grown by `pad`, or None.
+
+    The test is strict like Rect.colliderect: running along an edge does not count. A
+    segment that starts inside returns 0.
+    """
+    t_enter, t_exit = 0.0, 1.0
+    for start, delta, low, high in ((x0, x1 - x0, rect.left - pad, rect.right + pad),
+                                    (y0, y1 - y0, rect.top - pad, rect.bottom + pad)):
+        if delta == 0:
+            if not low < start < high:
+                return None
+            continue
+        t_low, t_high = (low - start) / delta, (high - start) / delta
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+        t_enter = max(t_enter, t_low)
+        t_exit = min(t_exit, t_high)
+        if t_enter >= t_exit:
+            return None
+    return t_enter
@@ -45,6 +45,11 @@ ASSET_DIR = "assets"
 IMAGE_DIR = f"{ASSET_DIR}/images"
 SOUND_DIR = f"{ASSET_DIR}/sounds"
 FONT_DIR = f"{ASSET_DIR}/fonts"
+# Assets the client loads into the shared cache at startup, before the first map is built
+ASSET_MANIFEST = {
+    'images': ["Wall_tile.png", "Blockade_tile.png", "Floor_tile.png", "player_blue.png", "player_red.png"],
+    'sounds': ["shooting-sound-fx-159024.mp3"],
+}
 
 MENU = 0
 PLAYING = 1
@@ -62,3 +67,107 @@ GAME_TIMER_DURATION = 300000
 MAX_PLAYERS = 2
 PLAYER_BLUE = 0
 PLAYER_RED = 1
+
+# Cell size (pixels) of the spatial hash GameState keeps over live players
+SPATIAL_HASH_CELL_SIZE = 64
+
+# How the simulating side advances projectiles: 'objects' (one Projectile per shot) or 'numpy'
+# (ProjectileSystem arrays, for very many live projectiles; needs NumPy). The system starts with
+# room for PROJECTILE_SYSTEM_CAPACITY projectiles and doubles it when full
+PROJECTILE_ENGINE = 'objects'
+PROJECTILE_SYSTEM_CAPACITY = 1024
+
+# 'binary' for the struct-packed wire format, 'json' for human-readable debug traffic
+NETWORK_PROTOCOL = 'binary'
+# Largest datagram the senders build (kept under common path MTUs); bigger messages are fragmented
+MAX_DATAGRAM_SIZE = 1200
+# Seconds between client pings (RTT samples), and the window per-second traffic rates are averaged over
+PING_INTERVAL = 1.0
+NETWORK_STATS_RATE_WINDOW = 1.0
+# Reliable channel for control messages: retransmit timeout bounds (seconds, doubled on every
+# resend), how often idle sockets check for due resends, and how long an ack may wait to ride along
+# with other traffic before it is sent alone
+RELIABLE_MIN_RTO = 0.1
+RELIABLE_INITIAL_RTO = 0.2
+RELIABLE_MAX_RTO = 1.0
+RELIABLE_POLL_INTERVAL = 0.05
+RELIABLE_ACK_DELAY = 0.03
+# Servers drop a client after CLIENT_TIMEOUT seconds of silence, checked in steps of CLIENT_TIMEOUT_RESOLUTION
+CLIENT_TIMEOUT = 10.0
+CLIENT_TIMEOUT_RESOLUTION = 0.5
+# Seconds between connect attempts until the server answers
+CONNECT_RETRY_INTERVAL = 0.5
+# Send each server flush with one sendmmsg(2) call (64-bit Linux) instead of a sendto per datagram.
+# Off by default: building the batch in Python costs about what the saved system calls do on
+# loopback, so enable it where system calls are dearer (e.g. hosts with syscall mitigations)
+NETWORK_SENDMMSG = False
+# Bytes allocated once per socket for receiving datagrams
+RECEIVE_BUFFER_SIZE = 65536
+# Fragment reassembly: seconds before an incomplete message is dropped, fragments allowed
+# per message, and incomplete messages held per endpoint
+FRAGMENT_TIMEOUT = 2.0
+FRAGMENT_MAX_COUNT = 64
+FRAGMENT_MAX_PENDING = 64
+# Snapshots kept on each end for delta compression against acknowledged baselines
+SNAPSHOT_HISTORY_SIZE = 32
+# Client input commands sent per second, and how many recent commands each packet repeats
+INPUT_SEND_RATE = 30
+INPUT_REDUNDANCY = 4
+# Client-side prediction of the local player: unacknowledged commands kept for replay,
+# corrections larger than the snap distance (pixels) jump, smaller ones blend by the factor
+CLIENT_PREDICTION = True
+PREDICTION_BUFFER_SIZE = 64
+PREDICTION_SNAP_DISTANCE = 64
+PREDICTION_CORRECTION = 0.5
+# Client snapshot interpolation: snapshots buffered, render delay bounds (s), how many
+# measured jitters of safety margin to add, and the longest extrapolation over a gap (s)
+SNAPSHOT_BUFFER_SIZE = 32
+INTERPOLATION_DELAY_MIN = 1 / 30
+INTERPOLATION_DELAY_MAX = 0.25
+INTERPOLATION_JITTER_FACTOR = 2.5
+INTERPOLATION_MAX_EXTRAPOLATION = 0.1
+# Lag compensation: hitbox samples kept on the host (one per simulation step) and the
+# furthest back (ms) a remote player's shots are checked against
+LAG_COMPENSATION = True
+LAG_COMPENSATION_HISTORY = 128
+LAG_COMPENSATION_MAX_REWIND = 250
+
+# Dedicated server (python -m src.server)
+SERVER_TICK_RATE = 60
+SERVER_SNAPSHOT_RATE = 30
+SERVER_MAX_FRAME_TIME = 0.25
+MATCH_COUNTDOWN_DURATION = 3.0
+# Concurrent rooms (matches) a single GameServer process will host
+SERVER_MAX_ROOMS = 512
+# Seconds between stats reports from sharded relay workers to their supervisor
+SHARD_STATS_INTERVAL = 5.0
+
+# Network logging: TRACE logs (sampled) packets, DEBUG/INFO connection events
+NETWORK_LOG_LEVEL = 'INFO'
+# Log one in N packets when NETWORK_LOG_LEVEL is TRACE
+NETWORK_TRACE_SAMPLE_RATE = 1
+# Recent network events kept in memory and dumped on errors (0 disables)
+NETWORK_LOG_RING_SIZE = 0
+
+# Network impairment proxy (python -m src.network.impairment). Latency and jitter are
+# milliseconds per direction; loss, duplicate and reorder are per-packet probabilities,
+# and a reordered packet is held back an extra reorder_delay ms
+NETWORK_PROFILES = {
+    'lan': {'latency': 1, 'jitter': 0.5},
+    'dsl': {'latency': 30, 'jitter': 5, 'loss': 0.005},
+    'wifi': {'latency': 15, 'jitter': 10, 'loss': 0.01, 'duplicate': 0.001, 'reorder': 0.01, 'reorder_delay': 20},
+    'mobile': {'latency': 60, 'jitter': 30, 'loss': 0.03, 'duplicate': 0.005, 'reorder': 0.03, 'reorder_delay': 40},
+    'congested': {'latency': 120, 'jitter': 60, 'loss': 0.08, 'duplicate': 0.01, 'reorder': 0.05, 'reorder_delay': 80},
+}
+# Scripted runs: (seconds, profile) steps, repeated until the proxy stops
+NETWORK_IMPAIRMENT_SCRIPTS = {
+    'commute': [(20, 'wifi'), (10, 'mobile'), (5, 'congested'), (10, 'mobile')],
+    'spikes': [(10, 'lan'), (2, 'congested')],
+}
+IMPAIRMENT_REPORT_INTERVAL = 5.0
+IMPAIRMENT_IDLE_TIMEOUT = 30.0
+
+# Bot load generator (python -m src.server.load_test)
+LOAD_TEST_REPORT_INTERVAL = 1.0
+LOAD_TEST_PING_INTERVAL = 0.5
+LOAD_TEST_LATENCY_SAMPLES = 100000
@@ -0,0 +1,196 @@
+import asyncio
+import socket
+import time
+from src.network.socket_server import GameServer
+from src.network.socket_client import GameClient
+from src.network.reliable import ReliableChannel
+from src.network.net_log import NetLogger
+from src.config.settings import (RECEIVE_BUFFER_SIZE, PING_INTERVAL, CONNECT_RETRY_INTERVAL, RELIABLE_POLL_INTERVAL,
+                                 CLIENT_TIMEOUT_RESOLUTION)
+
+log = NetLogger('duel.network.async')
+
+
+class DatagramHandler(asyncio.DatagramProtocol):
+    """Forwards datagrams to an owner exposing _process_datagram(data, address).
+
+    An owner with a flush method has it called once each batch of reads is handled.
+    """
+
+    def __init__(self, owner, flush=None):
+        self.owner = owner
+        self.flush = flush
+        self.flush_each = False
+
+    def datagram_received(self, data, addr):
+        self.owner._process_datagram(data, addr)
+        if self.flush_each:
+            self.batch_done()
+
+    def batch_done(self):
+        if self.flush:
+            self.flush()
+
+    def error_received(self, exc):
+        log.error("Datagram error: %s", exc)
+
+
+def attach_datagram_handler(loop, sock, handler):
+    """Read every queued datagram on each readiness event.
+
+    asyncio's stock datagram transport reads a single packet per wakeup, so on loops
+    that support add_reader the socket is drained here instead. Other loops (e.g. the
+    Windows proactor) fall back to create_datagram_endpoint.
+    """
+    sock.setblocking(False)
+    buffer = memoryview(bytearray(RECEIVE_BUFFER_SIZE))
+
+    def drain():
+        while True:
+            try:
+                size, address = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                handler.error_received(e)
+                break
+            handler.datagram_received(buffer[:size], address)
+        handler.batch_done()
+
+    try:
+        loop.add_reader(sock.fileno(), drain)
+    except NotImplementedError:
+        # The stock transport delivers one datagram at a time, so flush after each
+        handler.flush_each = True
+        return asyncio.ensure_future(loop.create_datagram_endpoint(lambda: handler, sock=sock))
+    return None
+
+
+def detach_datagram_handler(loop, sock):
+    try:
+        loop.remove_reader(sock.fileno())
+    except (NotImplementedError, ValueError, OSError):
+        pass
+
+
+class AsyncGameServer(GameServer):
+    """GameServer whose receive path and client timeouts run on an asyncio event loop.
+
+    start() must be called from the thread running the loop (or with `loop` passed in).
+    """
+
+    def __init__(self, host=None, port=0, loop=None):
+        super().__init__(host, port)
+        self.loop = loop
+        self.cleanup_handle = None
+        self.reliable_handle = None
+
+    def _listen_for_messages(self):
+        self.loop = self.loop or asyncio.get_running_loop()
+        attach_datagram_handler(self.loop, self.socket, DatagramHandler(self, self.flush_outgoing))
+        self.cleanup_handle = self.loop.call_later(CLIENT_TIMEOUT_RESOLUTION, self._run_cleanup)
+
+    def _run_cleanup(self):
+        if not self.running:
+            return
+        self._check_timeouts(time.time())
+        self.flush_outgoing()
+        self.cleanup_handle = self.loop.call_later(CLIENT_TIMEOUT_RESOLUTION, self._run_cleanup)
+
+    def _schedule_reliable(self):
+        if self.loop and self.running and not self.reliable_handle:
+            self.reliable_handle = self.loop.call_later(RELIABLE_POLL_INTERVAL, self._run_reliable)
+
+    def _run_reliable(self):
+        self.reliable_handle = None
+        self.flush_outgoing()
+        if self.reliable_active:
+            self._schedule_reliable()
+
+    def stop(self):
+        if self.cleanup_handle:
+            self.cleanup_handle.cancel()
+            self.cleanup_handle = None
+        if self.reliable_handle:
+            self.reliable_handle.cancel()
+            self.reliable_handle = None
+        if self.loop and self.socket:
+            detach_datagram_handler(self.loop, self.socket)
+        super().stop()
+
+
+class AsyncGameClient(GameClient):
+    """GameClient driven by an asyncio event loop; use `await connect_async(...)`."""
+
+    def __init__(self, loop=None):
+        super().__init__()
+        self.loop = loop
+        self.ping_handle = None
+        self.reliable_handle = None
+        self.welcome = None
+
+    async def connect_async(self, host, port, room=None, timeout=5.0):
+        self.loop = self.loop or asyncio.get_running_loop()
+        try:
+            log.info("Async client attempting to connect to %s:%s", host, port)
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind(('0.0.0.0', 0))
+            self.server_address = (host, port)
+            self.running = True
+            self.connected = False
+            self.reliable = ReliableChannel()
+            self.welcome = self.loop.create_future()
+            attach_datagram_handler(self.loop, self.socket, DatagramHandler(self))
+
+            connect_msg = {'type': 'connect'}
+            if room:
+                connect_msg['room'] = room
+            deadline = self.loop.time() + timeout
+            while True:
+                self.send_message(connect_msg)
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    await asyncio.wait_for(asyncio.shield(self.welcome), min(CONNECT_RETRY_INTERVAL, remaining))
+                    break
+                except asyncio.TimeoutError:
+                    continue
+        except (asyncio.TimeoutError, OSError) as e:
+            log.warning("Async client connection failed: %r", e)
+            self.disconnect()
+            return False
+        self.ping_handle = self.loop.call_soon(self._run_ping)
+        return True
+
+    def _handle_message(self, message):
+        super()._handle_message(message)
+        if self.connected and self.welcome and not self.welcome.done():
+            self.welcome.set_result(True)
+
+    def _run_ping(self):
+        if self.running and self.connected and self._check_ping(time.time()):
+            self.ping_handle = self.loop.call_later(min(1.0, PING_INTERVAL), self._run_ping)
+
+    def _schedule_reliable(self):
+        if self.loop and self.running and not self.reliable_handle:
+            self.reliable_handle = self.loop.call_later(RELIABLE_POLL_INTERVAL, self._run_reliable)
+
+    def _run_reliable(self):
+        self.reliable_handle = None
+        if not self.running:
+            return
+        self._service_reliable()
+        if self.reliable.busy():
+            self._schedule_reliable()
+
+    def disconnect(self):
+        if self.ping_handle:
+            self.ping_handle.cancel()
+            self.ping_handle = None
+        if self.reliable_handle:
+            self.reliable_handle.cancel()
+            self.reliable_handle = None
+        if self.loop and self.socket:
+            detach_datagram_handler(self.loop, self.socket)
+        super().disconnect()
@@ -0,0 +1,169 @@
+import ctypes
+import ctypes.util
+import socket
+import sys
+from array import array
+from itertools import accumulate, chain, islice
+
+# Linux caps one sendmmsg call at UIO_MAXIOV messages
+SENDMMSG_MAX = 1024
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort), ('sin_port', ctypes.c_uint16),
+                ('sin_addr', ctypes.c_ubyte * 4), ('sin_zero', ctypes.c_ubyte * 8)]
+
+
+def _load_sendmmsg():
+    if not hasattr(socket, 'AF_INET') or not ctypes.util.find_library('c'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+# On 64-bit little-endian Linux an iovec is two qwords and an mmsghdr eight:
+# name, namelen, iov, iovlen, control, controllen, flags, msg_len (each padded to 8 bytes).
+# A batch's headers are then built as qword arrays with slice assignments instead of
+# packing each message in Python.
+_QWORDS_PER_MMSGHDR = 8
+_QWORDS_PER_IOVEC = 2
+_SOCKADDR_SIZE = ctypes.sizeof(_SockAddrIn)
+_LAYOUT_SUPPORTED = (sys.byteorder == 'little' and ctypes.sizeof(ctypes.c_void_p) == 8 and
+                     ctypes.sizeof(_IOVec) == 8 * _QWORDS_PER_IOVEC and
+                     ctypes.sizeof(_MMsgHdr) == 8 * _QWORDS_PER_MMSGHDR and
+                     _MsgHdr.msg_iov.offset == 16 and _MsgHdr.msg_iovlen.offset == 24)
+
+
+def _address_of(data):
+    return ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p).value
+
+
+def _sockaddr(address):
+    try:
+        packed = socket.inet_aton(address[0])
+    except (OSError, TypeError):
+        return None
+    sockaddr = _SockAddrIn()
+    sockaddr.sin_family = socket.AF_INET
+    sockaddr.sin_port = socket.htons(address[1])
+    ctypes.memmove(sockaddr.sin_addr, packed, 4)
+    return bytes(sockaddr)
+
+
+class BatchSender:
+    """Sends a flush's (datagram, address) pairs as one batch.
+
+    With `use_sendmmsg` on 64-bit Linux the batch goes out through one sendmmsg(2)
+    call per SENDMMSG_MAX datagrams. Otherwise, on IPv6 sockets, or for an address that
+    is not a dotted IPv4 string, it is one sendto per datagram. Per-datagram errors are
+    reported through on_error and do not stop the rest of the batch.
+    """
+
+    def __init__(self, sock, use_sendmmsg=True):
+        self.socket = sock
+        self.enabled = use_sendmmsg and _sendmmsg is not None and _LAYOUT_SUPPORTED and sock.family == socket.AF_INET
+        self.sockaddrs = {}
+
+    def send(self, batch, on_error=None):
+        """Send each (data, address); returns how many datagrams the kernel accepted."""
+        if not self.enabled or len(batch) == 1:
+            return self._send_each(batch, on_error)
+        sent = 0
+        for start in range(0, len(batch), SENDMMSG_MAX):
+            sent += self._send_chunk(batch[start:start + SENDMMSG_MAX], on_error)
+        return sent
+
+    def _send_each(self, batch, on_error):
+        sent = 0
+        for data, address in batch:
+            try:
+                self.socket.sendto(data, address)
+                sent += 1
+            except OSError as e:
+                if on_error:
+                    on_error(address, e)
+        return sent
+
+    def _sockaddr(self, address):
+        sockaddr = self.sockaddrs.get(address)
+        if sockaddr is None:
+            sockaddr = _sockaddr(address)
+            if sockaddr is None:
+                return None
+            if len(self.sockaddrs) > 4096:
+                self.sockaddrs.clear()
+            self.sockaddrs[address] = sockaddr
+        return sockaddr
+
+    def _send_chunk(self, batch, on_error):
+        payloads, targets = zip(*batch)
+        try:
+            names = b''.join(map(self.sockaddrs.__getitem__, targets))
+        except KeyError:
+            # First datagrams to some address: resolve them, and send any that are not IPv4 one by one
+            resolved = [(data, address, self._sockaddr(address)) for data, address in batch]
+            fallback = [(data, address) for data, address, sockaddr in resolved if sockaddr is None]
+            kept = [entry for entry in resolved if entry[2] is not None]
+            sent = 0
+            if kept:
+                payloads, targets, sockaddrs = zip(*kept)
+                sent += self._sendmmsg(payloads, targets, b''.join(sockaddrs), on_error)
+            return sent + self._send_each(fallback, on_error)
+        return self._sendmmsg(payloads, targets, names, on_error)
+
+    def _sendmmsg(self, payloads, targets, names, on_error):
+        count = len(payloads)
+        sizes = array('Q', map(len, payloads))
+        joined = b''.join(payloads)
+        joined_address = _address_of(joined)
+        names_address = _address_of(names)
+        iovecs = array('Q', bytes(8 * _QWORDS_PER_IOVEC * count))
+        iovecs[0::2] = array('Q', islice(accumulate(chain((joined_address,), sizes)), count))
+        iovecs[1::2] = sizes
+        iovecs_address = iovecs.buffer_info()[0]
+        headers = array('Q', bytes(8 * _QWORDS_PER_MMSGHDR * count))
+        headers[0::8] = array('Q', range(names_address, names_address + count * _SOCKADDR_SIZE, _SOCKADDR_SIZE))
+        headers[1::8] = array('Q', [_SOCKADDR_SIZE]) * count
+        headers[2::8] = array('Q', range(iovecs_address, iovecs_address + count * 8 * _QWORDS_PER_IOVEC,
+                                         8 * _QWORDS_PER_IOVEC))
+        headers[3::8] = array('Q', [1]) * count
+        base = headers.buffer_info()[0]
+        stride = 8 * _QWORDS_PER_MMSGHDR
+        sent = 0
+        fd = self.socket.fileno()
+        offset = 0
+        while offset < count:
+            result = _sendmmsg(fd, base + offset * stride, count - offset, 0)
+            if result <= 0:
+                # The datagram at offset failed; report it and carry on with the rest
+                if on_error:
+                    on_error(targets[offset], OSError(ctypes.get_errno(), "sendmmsg failed"))
+                offset += 1
+                continue
+            sent += result
+            offset += result
+        return sent
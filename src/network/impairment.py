@@ -0,0 +1,221 @@
+import argparse
+import heapq
+import random
+import selectors
+import socket
+import sys
+import threading
+import time
+from src.network.net_log import NetLogger, configure_logging
+from src.config.settings import (NETWORK_PROFILES, NETWORK_IMPAIRMENT_SCRIPTS, IMPAIRMENT_REPORT_INTERVAL,
+                                 IMPAIRMENT_IDLE_TIMEOUT, RECEIVE_BUFFER_SIZE)
+
+log = NetLogger('duel.network.impairment')
+
+
+class ImpairmentProfile:
+    def __init__(self, name='custom', latency=0, jitter=0, loss=0.0, duplicate=0.0, reorder=0.0, reorder_delay=0):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.duplicate = duplicate
+        self.reorder = reorder
+        self.reorder_delay = reorder_delay
+
+    @classmethod
+    def named(cls, name):
+        return cls(name, **NETWORK_PROFILES[name])
+
+    def delays(self, rng):
+        """Delivery delays in seconds for one packet: none if it is lost, two if duplicated."""
+        if rng.random() < self.loss:
+            return []
+        copies = 2 if rng.random() < self.duplicate else 1
+        delays = []
+        for _ in range(copies):
+            delay = self.latency + rng.uniform(-self.jitter, self.jitter)
+            if rng.random() < self.reorder:
+                delay += self.reorder_delay
+            delays.append(max(0.0, delay) / 1000.0)
+        return delays
+
+
+class ImpairmentScript:
+    """Cycles through (seconds, profile name) steps."""
+
+    def __init__(self, steps):
+        self.steps = [(duration, ImpairmentProfile.named(name)) for duration, name in steps]
+        self.period = sum(duration for duration, _ in self.steps)
+
+    def profile_at(self, elapsed):
+        elapsed %= self.period
+        for duration, profile in self.steps:
+            if elapsed < duration:
+                return profile
+            elapsed -= duration
+        return self.steps[-1][1]
+
+
+class ImpairmentProxy:
+    """UDP proxy that delays, drops, duplicates and reorders packets in both directions.
+
+    Clients send to the proxy's port instead of the server's. Each client gets its own
+    upstream socket, so the server still sees one address per client.
+    """
+
+    def __init__(self, listen_port, target, profile='lan', script=None, seed=None):
+        self.listen_port = listen_port
+        self.target = target
+        self.profile = ImpairmentProfile.named(profile) if isinstance(profile, str) else profile
+        self.script = ImpairmentScript(NETWORK_IMPAIRMENT_SCRIPTS[script]) if isinstance(script, str) else script
+        self.rng = random.Random(seed)
+        self.socket = None
+        self.selector = None
+        self.upstreams = {}
+        self.queue = []
+        self.counter = 0
+        self.running = False
+        self.thread = None
+        self.start_time = 0
+        self.last_report = 0
+        self.stats = {direction: {'packets': 0, 'bytes': 0, 'delivered': 0, 'dropped': 0, 'duplicated': 0}
+                      for direction in ('up', 'down')}
+
+    def start(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('0.0.0.0', self.listen_port))
+        self.listen_port = self.socket.getsockname()[1]
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.socket, selectors.EVENT_READ, None)
+        self.running = True
+        self.start_time = self.last_report = time.monotonic()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        log.info("Impairment proxy on UDP %d -> %s:%d (%s)", self.listen_port, self.target[0], self.target[1],
+                 'script' if self.script else self.profile.name)
+        return True
+
+    def current_profile(self, now):
+        if self.script:
+            return self.script.profile_at(now - self.start_time)
+        return self.profile
+
+    def _run(self):
+        buffer = memoryview(bytearray(RECEIVE_BUFFER_SIZE))
+        while self.running:
+            now = time.monotonic()
+            timeout = 0.5
+            if self.queue:
+                timeout = max(0.0, min(timeout, self.queue[0][0] - now))
+            try:
+                events = self.selector.select(timeout)
+            except OSError:
+                break
+            now = time.monotonic()
+            for key, _ in events:
+                try:
+                    if key.data is None:
+                        size, address = self.socket.recvfrom_into(buffer)
+                        upstream = self._upstream_for(address, now)
+                        self._schedule('up', upstream, bytes(buffer[:size]), self.target, now)
+                    else:
+                        size = key.fileobj.recv_into(buffer)
+                        client = key.data
+                        client[1] = now
+                        self._schedule('down', self.socket, bytes(buffer[:size]), client[0], now)
+                except OSError as e:
+                    if self.running:
+                        log.warning("Proxy receive error: %s", e)
+            self._deliver_due(time.monotonic())
+            if now - self.last_report >= IMPAIRMENT_REPORT_INTERVAL:
+                self.last_report = now
+                self._expire_idle(now)
+                self._report(now)
+
+    def _upstream_for(self, address, now):
+        entry = self.upstreams.get(address)
+        if entry is None:
+            upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            upstream.bind(('0.0.0.0', 0))
+            client = [address, now]
+            self.selector.register(upstream, selectors.EVENT_READ, client)
+            entry = self.upstreams[address] = (upstream, client)
+        entry[1][1] = now
+        return entry[0]
+
+    def _schedule(self, direction, sock, data, address, now):
+        stats = self.stats[direction]
+        stats['packets'] += 1
+        stats['bytes'] += len(data)
+        delays = self.current_profile(now).delays(self.rng)
+        if not delays:
+            stats['dropped'] += 1
+        elif len(delays) > 1:
+            stats['duplicated'] += 1
+        for delay in delays:
+            self.counter += 1
+            heapq.heappush(self.queue, (now + delay, self.counter, direction, sock, data, address))
+
+    def _deliver_due(self, now):
+        while self.queue and self.queue[0][0] <= now:
+            _, _, direction, sock, data, address = heapq.heappop(self.queue)
+            try:
+                sock.sendto(data, address)
+                self.stats[direction]['delivered'] += 1
+            except OSError as e:
+                log.warning("Proxy send error to %s: %s", address, e)
+
+    def _expire_idle(self, now):
+        for address, (upstream, client) in list(self.upstreams.items()):
+            if now - client[1] > IMPAIRMENT_IDLE_TIMEOUT:
+                self.selector.unregister(upstream)
+                upstream.close()
+                del self.upstreams[address]
+
+    def _report(self, now):
+        elapsed = max(now - self.start_time, 1e-6)
+        for direction in ('up', 'down'):
+            stats = self.stats[direction]
+            log.info("%s: %d packets (%.1f kB/s), %d dropped, %d duplicated [%s]", direction, stats['packets'],
+                     stats['bytes'] / elapsed / 1000.0, stats['dropped'], stats['duplicated'],
+                     self.current_profile(now).name)
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        for upstream, _ in self.upstreams.values():
+            upstream.close()
+        self.upstreams.clear()
+        if self.selector:
+            self.selector.close()
+        if self.socket:
+            self.socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay UDP game traffic with simulated latency, jitter and loss")
+    parser.add_argument('--listen', type=int, default=0, help="UDP port clients connect to")
+    parser.add_argument('--target', default='127.0.0.1:12345', help="Server address as host:port")
+    parser.add_argument('--profile', choices=sorted(NETWORK_PROFILES), default='wifi')
+    parser.add_argument('--script', choices=sorted(NETWORK_IMPAIRMENT_SCRIPTS),
+                        help="Cycle through a scripted sequence of profiles instead")
+    parser.add_argument('--seed', type=int, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+    host, port = args.target.rsplit(':', 1)
+    configure_logging()
+    proxy = ImpairmentProxy(args.listen, (host, int(port)), args.profile, args.script, args.seed)
+    proxy.start()
+    try:
+        while proxy.running:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+from collections import deque
+from src.config.settings import INPUT_SEND_RATE, INPUT_REDUNDANCY
+
+# One input command is a bitmask of the held buttons
+MOVE_LEFT = 1 << 0
+MOVE_RIGHT = 1 << 1
+MOVE_UP = 1 << 2
+MOVE_DOWN = 1 << 3
+AIM_LEFT = 1 << 4
+AIM_RIGHT = 1 << 5
+AIM_UP = 1 << 6
+AIM_DOWN = 1 << 7
+SHOOT = 1 << 8
+
+AIM_MASK = AIM_LEFT | AIM_RIGHT | AIM_UP | AIM_DOWN
+
+
+def direction_bits(dx, dy, left, right, up, down):
+    bits = 0
+    if dx < 0:
+        bits |= left
+    elif dx > 0:
+        bits |= right
+    if dy < 0:
+        bits |= up
+    elif dy > 0:
+        bits |= down
+    return bits
+
+
+def bits_direction(bits, left, right, up, down):
+    dx = (1 if bits & right else 0) - (1 if bits & left else 0)
+    dy = (1 if bits & down else 0) - (1 if bits & up else 0)
+    return dx, dy
+
+
+def apply_input_command(player, buttons):
+    """Apply one command's movement and aim to player; returns True if it asks to shoot."""
+    player.move(*bits_direction(buttons, MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN))
+    player.rotate(*bits_direction(buttons, AIM_LEFT, AIM_RIGHT, AIM_UP, AIM_DOWN))
+    return bool(buttons & SHOOT)
+
+
+class InputCommandSender:
+    """Samples the frame's move/rotate/shoot actions into commands at a fixed rate.
+
+    Each input_commands message carries the newest `redundancy` commands, so the host
+    recovers a lost packet from the next one without a retransmit. Aim and shoot are
+    latched between samples so a tap shorter than the send interval is not lost.
+    """
+
+    def __init__(self, player_id, rate=INPUT_SEND_RATE, redundancy=INPUT_REDUNDANCY):
+        self.player_id = player_id
+        self.interval = 1.0 / rate
+        self.history = deque(maxlen=redundancy)
+        self.seq = 0
+        self.next_send_time = 0
+        self.move_bits = 0
+        self.latched_bits = 0
+
+    def add_action(self, action):
+        action_type = action.get('type')
+        if action_type == 'move':
+            self.move_bits = direction_bits(action.get('dx', 0), action.get('dy', 0),
+                                            MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN)
+        elif action_type == 'rotate':
+            aim = direction_bits(action.get('dx', 0), action.get('dy', 0), AIM_LEFT, AIM_RIGHT, AIM_UP, AIM_DOWN)
+            self.latched_bits = (self.latched_bits & ~AIM_MASK) | aim
+        elif action_type == 'shoot':
+            self.latched_bits |= SHOOT
+
+    def poll(self, current_time, view_seq=None, view_delay=0):
+        """Return the input_commands message to send now, or None until the next send is due.
+
+        view_seq is the newest snapshot applied on this client and view_delay how many
+        milliseconds behind it remote players are drawn (the interpolation delay); the
+        host uses both to rewind hit detection to what this player was seeing.
+        """
+        if current_time < self.next_send_time:
+            return None
+        self.next_send_time = max(self.next_send_time + self.interval, current_time)
+        self.seq += 1
+        self.history.append(self.move_bits | self.latched_bits)
+        self.move_bits = 0
+        self.latched_bits = 0
+        message = {
+            'type': 'input_commands',
+            'player_id': self.player_id,
+            'seq': self.seq,
+            'commands': list(self.history)
+        }
+        if view_seq:
+            message['view_seq'] = view_seq
+            if view_delay > 0:
+                message['view_delay'] = min(int(view_delay), 0xFFFF)
+        return message
+
+
+class InputCommandReceiver:
+    """Yields each command from a stream of redundant input_commands messages exactly once."""
+
+    def __init__(self):
+        self.last_seq = 0
+        self.lost = 0
+
+    def receive(self, message):
+        seq = message.get('seq', 0)
+        commands = message.get('commands', [])
+        if seq <= self.last_seq:
+            return []
+        fresh = min(len(commands), seq - self.last_seq)
+        self.lost += seq - self.last_seq - fresh
+        self.last_seq = seq
+        return commands[len(commands) - fresh:]
@@ -0,0 +1,80 @@
+import logging
+import time
+from collections import deque
+from src.config.settings import NETWORK_LOG_LEVEL, NETWORK_TRACE_SAMPLE_RATE, NETWORK_LOG_RING_SIZE
+
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+PACKET_FORMAT = "%s %s %s (%d bytes)"
+
+
+def configure_logging(level=logging.INFO):
+    logging.basicConfig(level=level, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+
+class NetLogger:
+    """Logger for the network hot path.
+
+    Level checks are plain boolean attributes (`trace_enabled`, `packets_enabled`, ...)
+    so call sites can skip argument building with a single attribute load. Messages
+    use %-style arguments and are only formatted when they are actually emitted. When
+    `ring_size` is set, the most recent events are kept unformatted in memory and
+    written out by error() or dump_ring().
+    """
+
+    def __init__(self, name, level=NETWORK_LOG_LEVEL, sample_rate=NETWORK_TRACE_SAMPLE_RATE,
+                 ring_size=NETWORK_LOG_RING_SIZE):
+        self.logger = logging.getLogger(name)
+        self.sample_rate = max(1, sample_rate)
+        self.packet_counter = 0
+        self.ring = deque(maxlen=ring_size) if ring_size else None
+        self.set_level(level)
+
+    def set_level(self, level):
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        self.level = level
+        self.logger.setLevel(level)
+        self.trace_enabled = level <= TRACE
+        self.debug_enabled = level <= logging.DEBUG
+        self.info_enabled = level <= logging.INFO
+        self.packets_enabled = self.trace_enabled or self.ring is not None
+
+    def packet(self, direction, address, msg_type, size):
+        """Record one packet; only every `sample_rate`-th one is written at TRACE level."""
+        if self.ring is not None:
+            self.ring.append((time.time(), TRACE, PACKET_FORMAT, (direction, address, msg_type, size)))
+        if self.trace_enabled:
+            self.packet_counter += 1
+            if self.packet_counter % self.sample_rate == 0:
+                self.logger.log(TRACE, PACKET_FORMAT, direction, address, msg_type, size)
+
+    def _log(self, level, enabled, msg, args):
+        if self.ring is not None:
+            self.ring.append((time.time(), level, msg, args))
+        if enabled:
+            self.logger.log(level, msg, *args)
+
+    def debug(self, msg, *args):
+        self._log(logging.DEBUG, self.debug_enabled, msg, args)
+
+    def info(self, msg, *args):
+        self._log(logging.INFO, self.info_enabled, msg, args)
+
+    def warning(self, msg, *args):
+        self._log(logging.WARNING, self.level <= logging.WARNING, msg, args)
+
+    def error(self, msg, *args):
+        self.dump_ring()
+        self._log(logging.ERROR, True, msg, args)
+
+    def dump_ring(self):
+        if not self.ring:
+            return
+        lines = []
+        for timestamp, level, msg, args in self.ring:
+            stamp = time.strftime('%H:%M:%S', time.localtime(timestamp)) + f".{int(timestamp * 1000) % 1000:03d}"
+            lines.append(f"  {stamp} {logging.getLevelName(level)} {msg % args if args else msg}")
+        self.ring.clear()
+        self.logger.error("Recent network events:\n%s", "\n".join(lines))
@@ -0,0 +1,116 @@
+import time
+from src.config.settings import NETWORK_STATS_RATE_WINDOW
+
+# Sequence counters are halved past this many expected packets so loss tracks recent traffic
+LOSS_WINDOW = 1000
+
+
+class PeerStats:
+    """Connection quality for one peer: RTT, jitter, loss and traffic per message type.
+
+    RTT and jitter are smoothed the way TCP does it (RFC 6298): jitter is the mean
+    deviation of the RTT samples. Loss comes from gaps in sequenced streams (snapshots,
+    input commands). Traffic is counted both per datagram on the wire and per message
+    type (encoded size, so bundled messages are attributed individually).
+    """
+
+    def __init__(self):
+        self.rtt = None
+        self.jitter = 0.0
+        self.min_rtt = None
+        self.sequences = {}
+        self.datagrams_in = 0
+        self.datagrams_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.types_in = {}
+        self.types_out = {}
+        self.window_start = time.monotonic()
+        self.window_totals = (0, 0, 0, 0)
+        self.rates = (0.0, 0.0, 0.0, 0.0)
+
+    def add_rtt_sample(self, rtt):
+        if self.rtt is None:
+            self.rtt = rtt
+            self.jitter = rtt / 2
+        else:
+            self.jitter += (abs(self.rtt - rtt) - self.jitter) / 4
+            self.rtt += (rtt - self.rtt) / 8
+        if self.min_rtt is None or rtt < self.min_rtt:
+            self.min_rtt = rtt
+
+    def record_sequence(self, stream, seq):
+        counters = self.sequences.get(stream)
+        if counters is None:
+            self.sequences[stream] = [seq, 1, 1]
+            return
+        last_seq, expected, received = counters
+        if seq > last_seq:
+            expected += seq - last_seq
+            counters[0] = seq
+        received += 1
+        if expected > LOSS_WINDOW:
+            expected //= 2
+            received //= 2
+        counters[1] = expected
+        counters[2] = received
+
+    @property
+    def loss(self):
+        expected = sum(counters[1] for counters in self.sequences.values())
+        received = sum(counters[2] for counters in self.sequences.values())
+        if not expected:
+            return 0.0
+        return max(0.0, 1.0 - received / expected)
+
+    def datagram_in(self, size):
+        self.datagrams_in += 1
+        self.bytes_in += size
+
+    def datagram_out(self, size):
+        self.datagrams_out += 1
+        self.bytes_out += size
+
+    def message_in(self, msg_type, size):
+        counts = self.types_in.get(msg_type)
+        if counts is None:
+            self.types_in[msg_type] = [1, size]
+        else:
+            counts[0] += 1
+            counts[1] += size
+
+    def message_out(self, msg_type, size):
+        counts = self.types_out.get(msg_type)
+        if counts is None:
+            self.types_out[msg_type] = [1, size]
+        else:
+            counts[0] += 1
+            counts[1] += size
+
+    def _update_rates(self, now):
+        elapsed = now - self.window_start
+        if elapsed < NETWORK_STATS_RATE_WINDOW:
+            return
+        totals = (self.datagrams_in, self.datagrams_out, self.bytes_in, self.bytes_out)
+        self.rates = tuple((total - previous) / elapsed for total, previous in zip(totals, self.window_totals))
+        self.window_totals = totals
+        self.window_start = now
+
+    def summary(self, now=None):
+        self._update_rates(time.monotonic() if now is None else now)
+        return {
+            'rtt_ms': self.rtt * 1000 if self.rtt is not None else None,
+            'min_rtt_ms': self.min_rtt * 1000 if self.min_rtt is not None else None,
+            'jitter_ms': self.jitter * 1000,
+            'loss': self.loss,
+            'packets_in_per_s': self.rates[0],
+            'packets_out_per_s': self.rates[1],
+            'bytes_in_per_s': self.rates[2],
+            'bytes_out_per_s': self.rates[3],
+            'datagrams_in': self.datagrams_in,
+            'datagrams_out': self.datagrams_out,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'messages_in': {t: {'count': c[0], 'bytes': c[1]} for t, c in self.types_in.items()},
+            'messages_out': {t: {'count': c[0], 'bytes': c[1]} for t, c in self.types_out.items()},
+        }
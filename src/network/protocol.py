@@ -0,0 +1,624 @@
+import itertools
+import json
+import struct
+import time
+from src.network.net_log import NetLogger
+from src.config.settings import (NETWORK_PROTOCOL, MAX_DATAGRAM_SIZE, FRAGMENT_TIMEOUT, FRAGMENT_MAX_COUNT,
+                                 FRAGMENT_MAX_PENDING)
+
+PROTOCOL_VERSION = 3
+JSON_TYPE_ID = 0
+# A bundle datagram carries several length-prefixed encoded messages
+BUNDLE_TYPE_ID = 255
+# A fragment datagram carries one piece of a message too large for a single datagram
+FRAGMENT_TYPE_ID = 254
+# A reliable envelope carries one message with its sequence number on a peer's reliable channel
+RELIABLE_TYPE_ID = 253
+
+HEADER = struct.Struct('!BB')
+BUNDLE_ENTRY = struct.Struct('!H')
+# message id, fragment index, fragment count
+FRAGMENT = struct.Struct('!IHH')
+RELIABLE = struct.Struct('!I')
+
+log = NetLogger('duel.network.protocol')
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+class Scalar:
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self.struct = struct.Struct('!' + fmt)
+
+    def encode(self, value, out):
+        out += self.struct.pack(value)
+
+    def decode(self, data, offset):
+        return self.struct.unpack_from(data, offset)[0], offset + self.struct.size
+
+
+class String:
+    LENGTH = struct.Struct('!B')
+
+    def encode(self, value, out):
+        raw = value.encode('utf-8')
+        out += self.LENGTH.pack(len(raw))
+        out += raw
+
+    def decode(self, data, offset):
+        length = data[offset]
+        offset += 1
+        return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+class Nullable:
+    FLAG = struct.Struct('!?')
+
+    def __init__(self, codec):
+        self.codec = codec
+
+    def encode(self, value, out):
+        out += self.FLAG.pack(value is not None)
+        if value is not None:
+            self.codec.encode(value, out)
+
+    def decode(self, data, offset):
+        present = data[offset]
+        offset += 1
+        if not present:
+            return None, offset
+        return self.codec.decode(data, offset)
+
+
+class Optional:
+    def __init__(self, codec):
+        self.codec = codec
+
+
+class Record:
+    """Fixed field layout for a dict; optional fields are flagged in a leading bitmask."""
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.optional = [name for name, codec in fields if isinstance(codec, Optional)]
+        self.nullable = {name for name, codec in fields
+                         if isinstance(codec, Optional) and isinstance(codec.codec, Nullable)}
+        self.mask = struct.Struct('!B' if len(self.optional) <= 8 else '!H') if self.optional else None
+        self.steps = []
+        run = []
+        for name, codec in fields:
+            if isinstance(codec, Scalar):
+                run.append((name, codec.fmt))
+                continue
+            if run:
+                self._add_run(run)
+                run = []
+            if isinstance(codec, Optional):
+                self.steps.append(('optional', name, codec.codec, 1 << self.optional.index(name)))
+            else:
+                self.steps.append(('field', name, codec, 0))
+        if run:
+            self._add_run(run)
+
+    def _add_run(self, run):
+        names = tuple(name for name, _ in run)
+        packer = struct.Struct('!' + ''.join(fmt for _, fmt in run))
+        self.steps.append(('run', names, packer, 0))
+
+    def encode(self, value, out):
+        consumed = 0
+        mask = 0
+        if self.mask:
+            for bit, name in enumerate(self.optional):
+                if name in value and (value[name] is not None or name in self.nullable):
+                    mask |= 1 << bit
+            out += self.mask.pack(mask)
+        for kind, name, codec, bit in self.steps:
+            if kind == 'run':
+                out += codec.pack(*[value[n] for n in name])
+                consumed += len(name)
+            elif kind == 'optional':
+                if name in value:
+                    consumed += 1
+                if mask & bit:
+                    codec.encode(value[name], out)
+            else:
+                codec.encode(value[name], out)
+                consumed += 1
+        if consumed != len(value):
+            raise ProtocolError("record has fields outside its layout")
+
+    def decode(self, data, offset):
+        value = {}
+        mask = 0
+        if self.mask:
+            mask = self.mask.unpack_from(data, offset)[0]
+            offset += self.mask.size
+        for kind, name, codec, bit in self.steps:
+            if kind == 'run':
+                value.update(zip(name, codec.unpack_from(data, offset)))
+                offset += codec.size
+            elif kind == 'optional':
+                if mask & bit:
+                    value[name], offset = codec.decode(data, offset)
+            else:
+                value[name], offset = codec.decode(data, offset)
+        return value, offset
+
+
+class List:
+    COUNT = struct.Struct('!H')
+
+    def __init__(self, codec):
+        self.codec = codec
+
+    def encode(self, value, out):
+        out += self.COUNT.pack(len(value))
+        for item in value:
+            self.codec.encode(item, out)
+
+    def decode(self, data, offset):
+        count = self.COUNT.unpack_from(data, offset)[0]
+        offset += self.COUNT.size
+        items = []
+        for _ in range(count):
+            item, offset = self.codec.decode(data, offset)
+            items.append(item)
+        return items, offset
+
+
+class BitWriter:
+    """Packs unsigned fields most significant bit first, padded out to whole bytes."""
+
+    def __init__(self):
+        self.value = 0
+        self.bits = 0
+
+    def write(self, value, bits):
+        if value < 0 or value >> bits:
+            raise ProtocolError(f"{value} does not fit in {bits} bits")
+        self.value = (self.value << bits) | value
+        self.bits += bits
+
+    def to_bytes(self):
+        pad = -self.bits % 8
+        return (self.value << pad).to_bytes((self.bits + pad) // 8, 'big')
+
+
+class BitReader:
+    """Reads fields written by BitWriter from at most max_bytes bytes of data at offset."""
+
+    def __init__(self, data, offset, max_bytes):
+        chunk = bytes(data[offset:offset + max_bytes])
+        self.value = int.from_bytes(chunk, 'big')
+        self.bits = len(chunk) * 8
+        self.position = 0
+
+    def read(self, bits):
+        self.position += bits
+        if self.position > self.bits:
+            raise ProtocolError("Truncated bit field")
+        return (self.value >> (self.bits - self.position)) & ((1 << bits) - 1)
+
+    def byte_length(self):
+        return (self.position + 7) // 8
+
+
+class Bits:
+    """Unsigned integer in a fixed number of bits; with `clamp`, out-of-range values saturate."""
+
+    def __init__(self, bits, clamp=False):
+        self.bits = bits
+        self.clamp = clamp
+        self.max_raw = (1 << bits) - 1
+
+    def quantize(self, value):
+        if self.clamp:
+            return min(max(value, 0), self.max_raw)
+        return value
+
+    def restore(self, raw):
+        return raw
+
+
+class Flag(Bits):
+    def __init__(self):
+        super().__init__(1)
+
+    def quantize(self, value):
+        return 1 if value else 0
+
+    def restore(self, raw):
+        return bool(raw)
+
+
+class Fixed(Bits):
+    """A float rounded to a multiple of `step` above `minimum`, e.g. sub-pixel positions.
+
+    Values past either end of the range are clamped to it.
+    """
+
+    def __init__(self, bits, step, minimum=0.0):
+        super().__init__(bits, clamp=True)
+        self.step = step
+        self.minimum = minimum
+
+    def quantize(self, value):
+        return super().quantize(int(round((value - self.minimum) / self.step)))
+
+    def restore(self, raw):
+        return raw * self.step + self.minimum
+
+
+class Direction(Bits):
+    """One of the eight 45 degree angles, as 3 bits."""
+
+    def __init__(self):
+        super().__init__(3)
+
+    def quantize(self, value):
+        if value % 45:
+            raise ProtocolError(f"Angle {value} is not a multiple of 45")
+        return int(value // 45) % 8
+
+    def restore(self, raw):
+        return raw * 45
+
+
+class BitRecord:
+    """Record layout packed at the bit level.
+
+    Each field is quantized to its codec's bit width, and an optional field costs one
+    presence bit when absent. The record is padded to a whole byte so it composes with
+    the byte-aligned codecs. Positions and counters clamp to their range; any other
+    value that does not fit (an id, an odd angle) raises ProtocolError naming the
+    field, and encode_message falls back to JSON instead of sending it distorted.
+    """
+
+    def __init__(self, *fields):
+        self.fields = [(name, codec.codec if isinstance(codec, Optional) else codec, isinstance(codec, Optional))
+                       for name, codec in fields]
+        self.max_bytes = (sum(codec.bits + optional for _, codec, optional in self.fields) + 7) // 8
+
+    def encode(self, value, out):
+        writer = BitWriter()
+        consumed = 0
+        for name, codec, optional in self.fields:
+            if optional:
+                present = value.get(name) is not None
+                writer.write(present, 1)
+                if name in value:
+                    consumed += 1
+                if not present:
+                    continue
+            else:
+                consumed += 1
+            try:
+                writer.write(codec.quantize(value[name]), codec.bits)
+            except ProtocolError as e:
+                raise ProtocolError(f"field {name!r}: {e}")
+        if consumed != len(value):
+            raise ProtocolError("record has fields outside its layout")
+        out += writer.to_bytes()
+
+    def decode(self, data, offset):
+        reader = BitReader(data, offset, self.max_bytes)
+        value = {}
+        for name, codec, optional in self.fields:
+            if optional and not reader.read(1):
+                continue
+            value[name] = codec.restore(reader.read(codec.bits))
+        return value, offset + reader.byte_length()
+
+
+U8 = Scalar('B')
+U16 = Scalar('H')
+U32 = Scalar('I')
+I16 = Scalar('h')
+I8 = Scalar('b')
+F32 = Scalar('f')
+BOOL = Scalar('?')
+STR = String()
+
+
+class MessageType:
+    def __init__(self, type_id, name, layout):
+        self.type_id = type_id
+        self.name = name
+        self.layout = layout
+
+
+MESSAGE_TYPES = {}
+MESSAGE_TYPES_BY_ID = {}
+
+
+def register_message(type_id, name, *fields):
+    if type_id in (JSON_TYPE_ID, BUNDLE_TYPE_ID, FRAGMENT_TYPE_ID, RELIABLE_TYPE_ID) or type_id in MESSAGE_TYPES_BY_ID:
+        raise ValueError(f"Message type id {type_id} is already in use")
+    message_type = MessageType(type_id, name, Record(*fields))
+    MESSAGE_TYPES[name] = message_type
+    MESSAGE_TYPES_BY_ID[type_id] = message_type
+    return message_type
+
+
+# Snapshot layouts carry every field as optional so the same schema serves full
+# snapshots and deltas that only contain the fields changed since the baseline.
+# Entity fields are quantized and bit-packed: positions to 1/16 px clamped to [-1024, 3072),
+# angles to one of eight directions, flags to single bits, counters saturating at 16 bits.
+POSITION = Fixed(16, 1 / 16, -1024.0)
+
+PLAYER_STATE = BitRecord(
+    ('id', Bits(4)),
+    ('x', Optional(POSITION)),
+    ('y', Optional(POSITION)),
+    ('angle', Optional(Direction())),
+    ('health', Optional(Bits(16, clamp=True))),
+    ('is_alive', Optional(Flag())),
+    ('score', Optional(Bits(16, clamp=True))),
+    ('is_respawning', Optional(Flag())),
+    ('respawn_time_remaining', Optional(Bits(16, clamp=True))),
+    ('spawn_x', Optional(POSITION)),
+    ('spawn_y', Optional(POSITION)),
+)
+
+PROJECTILE_STATE = BitRecord(
+    ('id', Bits(32)),
+    ('x', Optional(POSITION)),
+    ('y', Optional(POSITION)),
+    ('angle', Optional(Direction())),
+    ('owner_id', Optional(Bits(4))),
+)
+
+GAME_STATE = Record(
+    ('seq', U32),
+    ('baseline', Optional(U32)),
+    ('players', List(PLAYER_STATE)),
+    ('projectiles', List(PROJECTILE_STATE)),
+    ('removed_projectiles', Optional(List(U32))),
+    ('game_status', Optional(U8)),
+    ('winner', Optional(Nullable(U8))),
+    ('timer_remaining', Optional(U32)),
+    ('timer_active', Optional(BOOL)),
+    ('input_seq', Optional(U32)),
+    ('server_time', Optional(U32)),
+)
+
+PLAYER_INPUT = Record(
+    ('type', STR),
+    ('player_id', U8),
+    ('dx', Optional(I8)),
+    ('dy', Optional(I8)),
+)
+
+SHOT = Record(
+    ('x', F32),
+    ('y', F32),
+    ('angle', I16),
+    ('vel_x', F32),
+    ('vel_y', F32),
+)
+
+register_message(1, 'connect', ('room', Optional(STR)))
+register_message(2, 'welcome', ('player_id', U32), ('server_code', Optional(STR)), ('room', Optional(STR)))
+register_message(3, 'ping', ('seq', Optional(U32)), ('rtt', Optional(U16)))
+register_message(4, 'pong', ('seq', Optional(U32)))
+register_message(5, 'game_start')
+register_message(6, 'player_disconnected', ('player_id', U32), ('reason', Optional(STR)))
+register_message(7, 'game_state_update', ('data', GAME_STATE))
+register_message(8, 'player_input', ('data', PLAYER_INPUT))
+register_message(9, 'shoot', ('data', SHOT))
+register_message(10, 'countdown_start', ('duration', F32))
+register_message(11, 'countdown_cancel')
+register_message(12, 'restart_request')
+register_message(13, 'return_to_lobby')
+register_message(14, 'return_to_main_menu')
+register_message(15, 'ready_ping')
+register_message(16, 'ready_pong')
+register_message(17, 'snapshot_ack', ('seq', U32))
+register_message(18, 'player_assignment', ('player_id', U8))
+register_message(19, 'input_commands', ('player_id', U8), ('seq', U32), ('commands', List(U16)),
+                 ('view_seq', Optional(U32)), ('view_delay', Optional(U16)))
+register_message(20, 'reliable_ack', ('ack', U32), ('ack_bits', U32))
+
+
+def encode_json(message):
+    return HEADER.pack(PROTOCOL_VERSION, JSON_TYPE_ID) + json.dumps(message).encode('utf-8')
+
+
+def encode_message(message):
+    """Encode a message dict, falling back to JSON for types or fields without a binary layout."""
+    if NETWORK_PROTOCOL == 'json':
+        return encode_json(message)
+    message_type = MESSAGE_TYPES.get(message.get('type'))
+    if message_type is None:
+        return encode_json(message)
+    out = bytearray(HEADER.pack(PROTOCOL_VERSION, message_type.type_id))
+    body = {key: value for key, value in message.items() if key != 'type'}
+    try:
+        message_type.layout.encode(body, out)
+    except ProtocolError as e:
+        log.warning("Sending %s as JSON: %s", message_type.name, e)
+        return encode_json(message)
+    except (KeyError, TypeError, AttributeError, struct.error):
+        return encode_json(message)
+    return bytes(out)
+
+
+def decode_message(data):
+    try:
+        version, type_id = HEADER.unpack_from(data, 0)
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"Unsupported protocol version {version}")
+        if type_id == JSON_TYPE_ID:
+            message = json.loads(bytes(data[HEADER.size:]).decode('utf-8'))
+            if not isinstance(message, dict):
+                raise ProtocolError("JSON message is not an object")
+            return message
+        if type_id == RELIABLE_TYPE_ID:
+            seq = RELIABLE.unpack_from(data, HEADER.size)[0]
+            inner = data[HEADER.size + RELIABLE.size:]
+            if len(inner) >= HEADER.size and inner[1] == RELIABLE_TYPE_ID:
+                raise ProtocolError("Nested reliable envelope")
+            message = decode_message(inner)
+            if not isinstance(message, dict):
+                raise ProtocolError("Reliable envelope does not hold a message")
+            message['reliable_seq'] = seq
+            return message
+        message_type = MESSAGE_TYPES_BY_ID.get(type_id)
+        if message_type is None:
+            raise ProtocolError(f"Unknown message type id {type_id}")
+        message, _ = message_type.layout.decode(data, HEADER.size)
+    except ProtocolError:
+        raise
+    except (struct.error, IndexError, ValueError) as e:
+        # ValueError covers bad UTF-8 and invalid JSON
+        raise ProtocolError(f"Malformed packet: {e}")
+    message['type'] = message_type.name
+    return message
+
+
+def wrap_reliable(seq, payload):
+    """Put an encoded message in a reliable envelope; decode_message returns it with 'reliable_seq' set."""
+    return HEADER.pack(PROTOCOL_VERSION, RELIABLE_TYPE_ID) + RELIABLE.pack(seq) + payload
+
+
+def pack_datagrams(payloads, max_size=MAX_DATAGRAM_SIZE):
+    """Pack encoded messages into as few datagrams of at most max_size bytes as possible.
+
+    Small messages share bundle datagrams and larger ones go out alone. A message that
+    is bigger than max_size on its own is split into fragments. Order is preserved.
+    """
+    if len(payloads) == 1 and len(payloads[0]) <= max_size:
+        return payloads
+    datagrams = []
+    group = []
+    group_size = HEADER.size
+    for payload in payloads:
+        if len(payload) > max_size:
+            if group:
+                datagrams.append(_finish_bundle(group))
+                group = []
+                group_size = HEADER.size
+            datagrams.extend(fragment_payload(payload, max_size))
+            continue
+        entry_size = BUNDLE_ENTRY.size + len(payload)
+        if group and group_size + entry_size > max_size:
+            datagrams.append(_finish_bundle(group))
+            group = []
+            group_size = HEADER.size
+        group.append(payload)
+        group_size += entry_size
+    if group:
+        datagrams.append(_finish_bundle(group))
+    return datagrams
+
+
+_fragment_ids = itertools.count(1)
+
+
+def fragment_payload(payload, max_size=MAX_DATAGRAM_SIZE):
+    chunk_size = max_size - HEADER.size - FRAGMENT.size
+    count = -(-len(payload) // chunk_size)
+    if count > FRAGMENT_MAX_COUNT:
+        raise ProtocolError(f"Message of {len(payload)} bytes needs more than {FRAGMENT_MAX_COUNT} fragments")
+    message_id = next(_fragment_ids) & 0xFFFFFFFF
+    view = memoryview(payload)
+    return [HEADER.pack(PROTOCOL_VERSION, FRAGMENT_TYPE_ID) + FRAGMENT.pack(message_id, index, count) +
+            view[index * chunk_size:(index + 1) * chunk_size]
+            for index in range(count)]
+
+
+class FragmentAssembler:
+    """Reassembles fragmented messages per peer.
+
+    Incomplete messages are dropped once they are `timeout` seconds old, and at most
+    `max_pending` are held at a time; the oldest is evicted to make room.
+    """
+
+    def __init__(self, timeout=FRAGMENT_TIMEOUT, max_pending=FRAGMENT_MAX_PENDING):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = {}
+
+    def add(self, peer, data, current_time=None):
+        """Store one fragment; returns the whole payload once its last fragment arrives."""
+        current_time = time.monotonic() if current_time is None else current_time
+        try:
+            message_id, index, count = FRAGMENT.unpack_from(data, HEADER.size)
+        except struct.error as e:
+            raise ProtocolError(f"Malformed fragment: {e}")
+        if index >= count or count > FRAGMENT_MAX_COUNT:
+            raise ProtocolError(f"Bad fragment {index}/{count}")
+        key = (peer, message_id)
+        entry = self.pending.get(key)
+        if entry is None:
+            if len(self.pending) >= self.max_pending:
+                self.expire(current_time)
+                if len(self.pending) >= self.max_pending:
+                    del self.pending[next(iter(self.pending))]
+            entry = self.pending[key] = [current_time, [None] * count, 0]
+        chunks = entry[1]
+        if len(chunks) != count:
+            raise ProtocolError(f"Fragment count changed for message {message_id}")
+        if chunks[index] is None:
+            chunks[index] = bytes(data[HEADER.size + FRAGMENT.size:])
+            entry[2] += 1
+        if entry[2] < count:
+            return None
+        del self.pending[key]
+        return b''.join(chunks)
+
+    def expire(self, current_time=None):
+        current_time = time.monotonic() if current_time is None else current_time
+        for key in [key for key, entry in self.pending.items() if current_time - entry[0] > self.timeout]:
+            del self.pending[key]
+
+
+def _finish_bundle(group):
+    if len(group) == 1:
+        return group[0]
+    out = bytearray(HEADER.pack(PROTOCOL_VERSION, BUNDLE_TYPE_ID))
+    for payload in group:
+        out += BUNDLE_ENTRY.pack(len(payload))
+        out += payload
+    return bytes(out)
+
+
+def decode_datagram(data, fragments=None, peer=None, sizes=None):
+    """Decode a received datagram into the list of messages it carries.
+
+    Fragments are handed to the `fragments` assembler and yield nothing until the
+    message they belong to is complete. If `sizes` is a list, the encoded size of each
+    returned message is appended to it.
+    """
+    if len(data) >= HEADER.size and data[1] == FRAGMENT_TYPE_ID:
+        if fragments is None or data[0] != PROTOCOL_VERSION:
+            raise ProtocolError("Unexpected fragment")
+        data = fragments.add(peer, data)
+        if data is None:
+            return []
+    if len(data) < HEADER.size or data[1] != BUNDLE_TYPE_ID:
+        if sizes is not None:
+            sizes.append(len(data))
+        return [decode_message(data)]
+    if data[0] != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {data[0]}")
+    view = memoryview(data)
+    messages = []
+    offset = HEADER.size
+    try:
+        while offset < len(view):
+            length = BUNDLE_ENTRY.unpack_from(view, offset)[0]
+            offset += BUNDLE_ENTRY.size
+            if offset + length > len(view):
+                raise ProtocolError("Truncated bundle entry")
+            messages.append(decode_message(view[offset:offset + length]))
+            if sizes is not None:
+                sizes.append(length)
+            offset += length
+    except struct.error as e:
+        raise ProtocolError(f"Malformed bundle: {e}")
+    return messages
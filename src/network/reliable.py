@@ -0,0 +1,110 @@
+import threading
+import time
+from src.network.protocol import wrap_reliable
+from src.config.settings import RELIABLE_MIN_RTO, RELIABLE_INITIAL_RTO, RELIABLE_MAX_RTO
+
+# Control messages that change lobby or match state; losing one desynchronises the peers,
+# so the transports send these on the reliable channel. Snapshots and inputs stay unreliable.
+RELIABLE_MESSAGE_TYPES = frozenset((
+    'game_start', 'player_disconnected', 'player_assignment', 'countdown_start', 'countdown_cancel',
+    'restart_request', 'return_to_lobby', 'return_to_main_menu', 'ready_ping', 'ready_pong',
+))
+
+# Receivers hold at most this many messages that arrived ahead of a gap (one per ack bit)
+ACK_WINDOW = 32
+
+
+class ReliableChannel:
+    """Sequenced, acknowledged delivery of control messages over one UDP link.
+
+    Each sent message is wrapped with a sequence number and kept until the peer acks it;
+    it is resent whenever its retransmit timeout passes, and the timeout doubles on every
+    resend up to `max_rto`. The receiver delivers messages once each, in send order,
+    holding back those that arrive ahead of a gap. It acks with the highest in-order
+    sequence plus a bitmask of the ones received past it, so only missing messages are
+    resent. Acks are taken by the owner's flush and ride in the same bundle as whatever
+    else goes to the peer.
+    """
+
+    def __init__(self, min_rto=RELIABLE_MIN_RTO, initial_rto=RELIABLE_INITIAL_RTO, max_rto=RELIABLE_MAX_RTO):
+        self.min_rto = min_rto
+        self.initial_rto = initial_rto
+        self.max_rto = max_rto
+        self.lock = threading.Lock()
+        self.next_seq = 1
+        # seq -> [wrapped payload, resend deadline, current timeout]
+        self.unacked = {}
+        self.delivered_seq = 0
+        self.early = {}
+        self.ack_since = None
+        self.retransmits = 0
+
+    def wrap(self, payload, current_time=None, rtt=None):
+        """Assign the next sequence number to an encoded message; returns the payload to send."""
+        current_time = time.monotonic() if current_time is None else current_time
+        rto = self.initial_rto if rtt is None else min(self.max_rto, max(self.min_rto, 2 * rtt))
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            wrapped = wrap_reliable(seq, payload)
+            self.unacked[seq] = [wrapped, current_time + rto, rto]
+        return wrapped
+
+    def receive(self, message, current_time=None):
+        """Accept a message carrying 'reliable_seq'; returns the messages now deliverable, in order."""
+        seq = message.pop('reliable_seq')
+        with self.lock:
+            if self.ack_since is None:
+                self.ack_since = time.monotonic() if current_time is None else current_time
+            if seq <= self.delivered_seq or seq in self.early:
+                return []
+            if seq > self.delivered_seq + ACK_WINDOW:
+                return []
+            if seq != self.delivered_seq + 1:
+                self.early[seq] = message
+                return []
+            ready = [message]
+            self.delivered_seq = seq
+            while self.delivered_seq + 1 in self.early:
+                self.delivered_seq += 1
+                ready.append(self.early.pop(self.delivered_seq))
+            return ready
+
+    def acknowledge(self, ack, ack_bits):
+        with self.lock:
+            for seq in [seq for seq in self.unacked
+                        if seq <= ack or (seq <= ack + ACK_WINDOW and ack_bits & (1 << (seq - ack - 1)))]:
+                del self.unacked[seq]
+
+    def ack_due(self, current_time, delay=0.0):
+        """True if received messages are waiting to be acked for at least `delay` seconds."""
+        since = self.ack_since
+        return since is not None and current_time - since >= delay
+
+    def take_ack(self):
+        """The reliable_ack message for everything received so far, or None if nothing is owed."""
+        with self.lock:
+            if self.ack_since is None:
+                return None
+            self.ack_since = None
+            ack_bits = 0
+            for seq in self.early:
+                ack_bits |= 1 << (seq - self.delivered_seq - 1)
+            return {'type': 'reliable_ack', 'ack': self.delivered_seq, 'ack_bits': ack_bits}
+
+    def due(self, current_time=None):
+        """Payloads whose retransmit timeout has passed; their timeouts are backed off."""
+        current_time = time.monotonic() if current_time is None else current_time
+        resend = []
+        with self.lock:
+            for entry in self.unacked.values():
+                if current_time >= entry[1]:
+                    entry[2] = min(self.max_rto, entry[2] * 2)
+                    entry[1] = current_time + entry[2]
+                    resend.append(entry[0])
+            self.retransmits += len(resend)
+        return resend
+
+    def busy(self):
+        """True while messages await an ack or an ack is owed to the peer."""
+        return bool(self.unacked) or self.ack_since is not None
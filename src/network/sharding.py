@@ -0,0 +1,248 @@
+import multiprocessing
+import os
+import queue
+import selectors
+import socket
+import struct
+import time
+import zlib
+from src.network.socket_server import GameServer
+from src.network.protocol import decode_datagram, ProtocolError
+from src.network.net_log import NetLogger
+from src.config.settings import SHARD_STATS_INTERVAL, RECEIVE_BUFFER_SIZE, RELIABLE_POLL_INTERVAL
+
+log = NetLogger('duel.network.shard')
+
+# Forwarded packets carry the original client address ahead of the datagram. A header
+# with no datagram goes the other way: the owner telling the forwarder to drop its route
+FORWARD_HEADER = struct.Struct('!4sH')
+
+
+def room_owner(room_code, worker_count):
+    return zlib.crc32(room_code.encode('utf-8')) % worker_count
+
+
+class ShardWorkerServer(GameServer):
+    """One worker of a sharded relay: owns the rooms whose code hashes to its index.
+
+    Every worker binds the public port with SO_REUSEPORT, so the kernel spreads clients
+    across workers by address. A packet that lands on a worker which does not own the
+    client's room is passed over loopback to the owner, which replies straight from its
+    own socket on the shared port. The receiving worker remembers the route until the
+    owner disconnects the client and tells it to forget the address.
+    """
+
+    def __init__(self, port, worker_index, forward_sockets, stats_queue):
+        super().__init__(port=port)
+        self.worker_index = worker_index
+        self.forward_sockets = forward_sockets
+        self.forward_addresses = [sock.getsockname() for sock in forward_sockets]
+        self.forward_indexes = {address: index for index, address in enumerate(self.forward_addresses)}
+        self.forward_socket = forward_sockets[worker_index]
+        self.stats_queue = stats_queue
+        # Client address -> owning worker, on the worker the kernel hands its packets to
+        self.routes = {}
+        # Client address -> worker that forwards its packets here, on the owner
+        self.forwarders = {}
+        self.forward_buffer = memoryview(bytearray(FORWARD_HEADER.size + RECEIVE_BUFFER_SIZE))
+        self.packets_in = 0
+        self.packets_forwarded = 0
+        self.last_stats_time = 0
+
+    def _create_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        return sock
+
+    def _receive_loop(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.socket, selectors.EVENT_READ, self._on_public_readable)
+        selector.register(self.forward_socket, selectors.EVENT_READ, self._on_forward_readable)
+        while self.running:
+            try:
+                for key, _ in selector.select(timeout=RELIABLE_POLL_INTERVAL if self.reliable_active else 1.0):
+                    key.data()
+                current_time = time.time()
+                self._check_timeouts(current_time)
+                self.flush_outgoing()
+                self._report_stats(current_time)
+            except Exception as e:
+                if self.running:
+                    log.error("Worker %d receive error: %s", self.worker_index, e)
+        selector.close()
+
+    def _on_public_readable(self):
+        size, address = self.socket.recvfrom_into(self.recv_buffer)
+        data = self.recv_buffer[:size]
+        self.packets_in += 1
+        if address in self.client_index:
+            self._process_datagram(data, address)
+            return
+        owner = self.routes.get(address)
+        if owner is None:
+            owner = self._find_owner(data)
+            if owner is None:
+                return
+            if owner != self.worker_index:
+                self.routes[address] = owner
+        if owner == self.worker_index:
+            self._process_datagram(data, address)
+        else:
+            self._forward(owner, data, address)
+
+    def _on_forward_readable(self):
+        size, sender = self.forward_socket.recvfrom_into(self.forward_buffer)
+        ip, port = FORWARD_HEADER.unpack_from(self.forward_buffer, 0)
+        address = (socket.inet_ntoa(ip), port)
+        if size == FORWARD_HEADER.size:
+            self.routes.pop(address, None)
+            return
+        forwarder = self.forward_indexes.get(sender)
+        if forwarder is not None:
+            self.forwarders[address] = forwarder
+        self._process_datagram(self.forward_buffer[FORWARD_HEADER.size:size], address)
+
+    def _find_owner(self, data):
+        try:
+            message = decode_datagram(data)[0]
+        except (ProtocolError, IndexError):
+            return None
+        if message.get('type') != 'connect':
+            return None
+        return room_owner(message.get('room') or self.server_code, len(self.forward_addresses))
+
+    def _forward(self, owner, data, address):
+        header = FORWARD_HEADER.pack(socket.inet_aton(address[0]), address[1])
+        self.forward_socket.sendto(header + data, self.forward_addresses[owner])
+        self.packets_forwarded += 1
+
+    def _release_route(self, address):
+        forwarder = self.forwarders.pop(address, None)
+        if forwarder is not None:
+            header = FORWARD_HEADER.pack(socket.inet_aton(address[0]), address[1])
+            self.forward_socket.sendto(header, self.forward_addresses[forwarder])
+
+    def _connect_client(self, address, room_code, current_time):
+        # Only reachable through a stale route (an address reused for a different room);
+        # the connect is dropped rather than creating a room on the wrong worker.
+        owner = room_owner(room_code or self.server_code, len(self.forward_addresses))
+        if owner != self.worker_index:
+            log.warning("Worker %d dropping connect for room %s owned by worker %d", self.worker_index, room_code, owner)
+            # The forwarder re-decodes the client's next connect attempt
+            self._release_route(address)
+            return
+        super()._connect_client(address, room_code, current_time)
+
+    def _disconnect_client(self, client_id):
+        room = self.client_rooms.get(client_id)
+        entry = room.clients.get(client_id) if room is not None else None
+        super()._disconnect_client(client_id)
+        if entry is not None:
+            self._release_route(entry[0])
+
+    def _report_stats(self, current_time):
+        if current_time - self.last_stats_time < SHARD_STATS_INTERVAL:
+            return
+        self.last_stats_time = current_time
+        try:
+            self.stats_queue.put_nowait({
+                'worker': self.worker_index,
+                'pid': os.getpid(),
+                'rooms': len(self.rooms),
+                'clients': len(self.client_rooms),
+                'packets_in': self.packets_in,
+                'packets_forwarded': self.packets_forwarded,
+                'time': current_time
+            })
+        except queue.Full:
+            pass
+
+
+def _run_worker(port, worker_index, forward_sockets, stats_queue):
+    worker = ShardWorkerServer(port, worker_index, forward_sockets, stats_queue)
+    worker.start()
+    try:
+        while worker.running:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+class ShardSupervisor:
+    """Forks relay workers sharing one UDP port and aggregates the stats they report."""
+
+    def __init__(self, port=0, workers=None):
+        self.port = port
+        self.worker_count = workers or os.cpu_count() or 1
+        self.context = multiprocessing.get_context('fork')
+        self.stats_queue = self.context.Queue(maxsize=1024)
+        self.processes = []
+        self.forward_sockets = []
+        self.worker_stats = {}
+        self.running = False
+
+    def start(self):
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            log.error("SO_REUSEPORT is not available on this platform")
+            return False
+        if not self.port:
+            probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            probe.bind(('0.0.0.0', 0))
+            self.port = probe.getsockname()[1]
+            probe.close()
+        for _ in range(self.worker_count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(('127.0.0.1', 0))
+            self.forward_sockets.append(sock)
+        for index in range(self.worker_count):
+            process = self.context.Process(target=_run_worker,
+                                           args=(self.port, index, self.forward_sockets, self.stats_queue),
+                                           daemon=True)
+            process.start()
+            self.processes.append(process)
+        self.running = True
+        log.info("Shard supervisor started %d workers on UDP port %d", self.worker_count, self.port)
+        return True
+
+    def poll_stats(self, timeout=0.0):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                stats = self.stats_queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            self.worker_stats[stats['worker']] = stats
+        return self.get_stats()
+
+    def get_stats(self):
+        alive = sum(1 for p in self.processes if p.is_alive())
+        totals = {'workers': len(self.processes), 'workers_alive': alive,
+                  'rooms': 0, 'clients': 0, 'packets_in': 0, 'packets_forwarded': 0}
+        for stats in self.worker_stats.values():
+            for key in ('rooms', 'clients', 'packets_in', 'packets_forwarded'):
+                totals[key] += stats[key]
+        return totals
+
+    def run(self):
+        last_report = 0
+        while self.running:
+            stats = self.poll_stats(timeout=1.0)
+            if time.time() - last_report >= SHARD_STATS_INTERVAL:
+                last_report = time.time()
+                log.info("Shards: %d/%d alive, %d rooms, %d clients, %d packets in, %d forwarded",
+                         stats['workers_alive'], stats['workers'], stats['rooms'], stats['clients'],
+                         stats['packets_in'], stats['packets_forwarded'])
+
+    def stop(self):
+        self.running = False
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout=2.0)
+        for sock in self.forward_sockets:
+            sock.close()
+        log.info("Shard supervisor stopped")
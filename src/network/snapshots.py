@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from src.config.settings import SNAPSHOT_HISTORY_SIZE
+
+SNAPSHOT_FIELDS = ('game_status', 'winner', 'timer_remaining', 'timer_active', 'input_seq', 'server_time')
+
+
+def _diff_entry(baseline, current):
+    changed = {'id': current['id']}
+    for key, value in current.items():
+        if baseline.get(key) != value:
+            changed[key] = value
+    return changed
+
+
+def diff_snapshot(baseline, current):
+    """Return the fields of `current` that differ from `baseline`, keyed for apply_snapshot_delta."""
+    delta = {'players': [], 'projectiles': []}
+    for key in SNAPSHOT_FIELDS:
+        if key in current and baseline.get(key) != current[key]:
+            delta[key] = current[key]
+
+    base_players = {p['id']: p for p in baseline.get('players', [])}
+    for player in current.get('players', []):
+        changed = _diff_entry(base_players.get(player['id'], {}), player)
+        if len(changed) > 1:
+            delta['players'].append(changed)
+
+    base_projectiles = {p['id']: p for p in baseline.get('projectiles', [])}
+    current_ids = set()
+    for proj in current.get('projectiles', []):
+        current_ids.add(proj['id'])
+        changed = _diff_entry(base_projectiles.get(proj['id'], {}), proj)
+        if len(changed) > 1 or proj['id'] not in base_projectiles:
+            delta['projectiles'].append(changed)
+    removed = [proj_id for proj_id in base_projectiles if proj_id not in current_ids]
+    if removed:
+        delta['removed_projectiles'] = removed
+    return delta
+
+
+def apply_snapshot_delta(baseline, delta):
+    snapshot = {key: baseline[key] for key in SNAPSHOT_FIELDS if key in baseline}
+    for key in SNAPSHOT_FIELDS:
+        if key in delta:
+            snapshot[key] = delta[key]
+
+    players = OrderedDict((p['id'], p) for p in baseline.get('players', []))
+    for changed in delta.get('players', []):
+        players[changed['id']] = {**players.get(changed['id'], {}), **changed}
+    snapshot['players'] = list(players.values())
+
+    projectiles = OrderedDict((p['id'], p) for p in baseline.get('projectiles', []))
+    for proj_id in delta.get('removed_projectiles', []):
+        projectiles.pop(proj_id, None)
+    for changed in delta.get('projectiles', []):
+        projectiles[changed['id']] = {**projectiles.get(changed['id'], {}), **changed}
+    snapshot['projectiles'] = list(projectiles.values())
+    return snapshot
+
+
+class SnapshotEncoder:
+    """Host side: numbers outgoing snapshots and deltas them against the last acknowledged one."""
+
+    def __init__(self, history_size=SNAPSHOT_HISTORY_SIZE):
+        self.history_size = history_size
+        self.history = OrderedDict()
+        self.send_times = {}
+        self.next_seq = 1
+        self.acked_seq = None
+
+    def encode(self, snapshot, send_time=None):
+        seq = self.next_seq
+        self.next_seq += 1
+        self.history[seq] = snapshot
+        if send_time is not None:
+            self.send_times[seq] = send_time
+        while len(self.history) > self.history_size:
+            old_seq, _ = self.history.popitem(last=False)
+            self.send_times.pop(old_seq, None)
+
+        baseline = self.history.get(self.acked_seq)
+        if baseline is None:
+            message = dict(snapshot)
+        else:
+            message = diff_snapshot(baseline, snapshot)
+            message['baseline'] = self.acked_seq
+        message['seq'] = seq
+        return message
+
+    def acknowledge(self, seq):
+        if seq in self.history and (self.acked_seq is None or seq > self.acked_seq):
+            self.acked_seq = seq
+
+    def sent_time(self, seq):
+        """When snapshot seq was encoded, if it was given a send_time and is still in history."""
+        return self.send_times.get(seq)
+
+    def reset(self):
+        self.history.clear()
+        self.send_times.clear()
+        self.acked_seq = None
+
+
+class SnapshotDecoder:
+    """Client side: rebuilds full snapshots from deltas and drops stale or unresolvable packets."""
+
+    def __init__(self, history_size=SNAPSHOT_HISTORY_SIZE):
+        self.history_size = history_size
+        self.history = OrderedDict()
+        self.latest_seq = 0
+
+    def decode(self, message):
+        seq = message.get('seq')
+        if seq is None:
+            return message
+        if seq <= self.latest_seq:
+            return None
+
+        baseline_seq = message.get('baseline')
+        if baseline_seq is None:
+            snapshot = {key: value for key, value in message.items() if key not in ('seq', 'baseline')}
+        else:
+            baseline = self.history.get(baseline_seq)
+            if baseline is None:
+                return None
+            snapshot = apply_snapshot_delta(baseline, message)
+
+        self.latest_seq = seq
+        self.history[seq] = snapshot
+        while len(self.history) > self.history_size:
+            self.history.popitem(last=False)
+        return snapshot
@@ -1,7 +1,14 @@
 import socket
 import threading
-import json
 import time
+from src.network.protocol import encode_message, decode_datagram, pack_datagrams, FragmentAssembler, ProtocolError
+from src.network.net_stats import PeerStats
+from src.network.reliable import ReliableChannel, RELIABLE_MESSAGE_TYPES
+from src.config.settings import (RECEIVE_BUFFER_SIZE, PING_INTERVAL, CONNECT_RETRY_INTERVAL, RELIABLE_POLL_INTERVAL,
+                                 RELIABLE_ACK_DELAY)
+from src.network.net_log import NetLogger
+
+log = NetLogger('duel.network.client')
 
 class GameClient:
     def __init__(self):
@@ -9,98 +16,131 @@ class GameClient:
         self.connected = False
         self.running = False
         self.player_id = None
+        self.assigned_player_id = None
         self.server_code = None
+        self.room = None
         self.server_address = None
         self.message_handlers = {}
         self.receive_thread = None
+        # Messages queued with queue_message() go out together on the next flush()
+        self.outgoing = []
+        self.outgoing_lock = threading.Lock()
+        self.fragments = FragmentAssembler()
+        self.recv_buffer = memoryview(bytearray(RECEIVE_BUFFER_SIZE))
+        self.stats = PeerStats()
+        # Control messages (RELIABLE_MESSAGE_TYPES) are sequenced, acked and resent on this channel
+        self.reliable = ReliableChannel()
+        self.ping_seq = 0
+        self.ping_times = {}
         self.last_ping = 0
         self.last_pong = 0
         self.connection_timeout = 10.0 
         self.connection_lost = False
         self.enable_timeout_check = False
         
-    def connect(self, host, port):
+    def connect(self, host, port, room=None):
         try:
-            print(f"Client attempting to connect to {host}:{port}")
+            log.info("Client attempting to connect to %s:%s", host, port)
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.server_address = (host, port)
             self.running = True
             self.connected = False
+            self.reliable = ReliableChannel()
             
             bind_host = '0.0.0.0'
             
             self.socket.bind((bind_host, 0))
             client_port = self.socket.getsockname()[1]
-            print(f"Client bound to {bind_host}:{client_port}")
+            log.debug("Client bound to %s:%s", bind_host, client_port)
             
             self.receive_thread = threading.Thread(target=self._receive_loop)
             self.receive_thread.daemon = True
             self.receive_thread.start()
             
-            print("Client sending connect message")
-            self.send_message({'type': 'connect'})
+            log.debug("Client sending connect message")
+            connect_msg = {'type': 'connect'}
+            if room:
+                connect_msg['room'] = room
             
+            # The connect or the welcome may be lost, so keep asking until the server answers
             start_time = time.time()
+            last_attempt = None
             while not self.connected and (time.time() - start_time) < 5.0:
-                time.sleep(0.1)
+                if last_attempt is None or time.time() - last_attempt >= CONNECT_RETRY_INTERVAL:
+                    last_attempt = time.time()
+                    self.send_message(connect_msg)
+                time.sleep(0.05)
             
             if self.connected:
-                print("Client successfully connected to server")
+                log.info("Client successfully connected to server")
                 ping_thread = threading.Thread(target=self._ping_loop)
                 ping_thread.daemon = True
                 ping_thread.start()
                 return True
             else:
-                print("Client connection timeout")
+                log.warning("Client connection timeout")
                 self.running = False
                 return False
             
         except Exception as e:
-            print(f"Client connection error: {e}")
+            log.error("Client connection error: %s", e)
             self.running = False
             return False
             
     def _receive_loop(self):
-        print("Client receive loop started")
+        log.debug("Client receive loop started")
+        self.socket.settimeout(RELIABLE_POLL_INTERVAL)
         while self.running:
             try:
-                self.socket.settimeout(1.0)
-                data, address = self.socket.recvfrom(1024)
-                print(f"Client received data from {address}: {data}")
-                
-                def normalize_address(addr):
-                    if addr in ['localhost', '127.0.0.1']:
-                        return '127.0.0.1'
-                    return addr
-                
-                server_addr = normalize_address(self.server_address[0])
-                from_addr = normalize_address(address[0])
-                
-                if ((from_addr == server_addr or 
-                     (server_addr == 'localhost' and from_addr == '127.0.0.1') or
-                     (server_addr == '127.0.0.1' and from_addr == 'localhost')) and
-                    address[1] == self.server_address[1]):
-                    try:
-                        message = json.loads(data.decode('utf-8'))
-                        print(f"Client parsed message: {message}")
-                        self._handle_message(message)
-                    except json.JSONDecodeError:
-                        print(f"Client: Invalid JSON from {address}: {data}")
-                        
+                size, address = self.socket.recvfrom_into(self.recv_buffer)
+                self._process_datagram(self.recv_buffer[:size], address)
+                self._service_reliable()
             except socket.timeout:
+                self._service_reliable()
                 continue
             except Exception as e:
                 if self.running:
-                    print(f"Client receive error: {e}")
+                    log.error("Client receive error: %s", e)
                     self._handle_connection_lost()
                 break
                 
-        print("Client receive loop ended")
+        log.debug("Client receive loop ended")
         self.connected = False
         
+    def _process_datagram(self, data, address):
+        def normalize_address(addr):
+            if addr in ['localhost', '127.0.0.1']:
+                return '127.0.0.1'
+            return addr
+        
+        server_addr = normalize_address(self.server_address[0])
+        from_addr = normalize_address(address[0])
+        
+        if ((from_addr == server_addr or 
+             (server_addr == 'localhost' and from_addr == '127.0.0.1') or
+             (server_addr == '127.0.0.1' and from_addr == 'localhost')) and
+            address[1] == self.server_address[1]):
+            sizes = []
+            try:
+                messages = decode_datagram(data, self.fragments, address, sizes)
+            except ProtocolError as e:
+                log.warning("Invalid packet from %s: %s", address, e)
+                return
+            self.stats.datagram_in(len(data))
+            for message, size in zip(messages, sizes):
+                self.stats.message_in(message.get('type'), size)
+                if log.packets_enabled:
+                    log.packet('recv', address, message.get('type'), len(data))
+                if 'reliable_seq' in message:
+                    for delivered in self.reliable.receive(message):
+                        self._handle_message(delivered)
+                    self._schedule_reliable()
+                else:
+                    self._handle_message(message)
+        
     def _handle_connection_lost(self):
         if not self.connection_lost:
-            print("Client connection lost detected")
+            log.warning("Client connection lost detected")
             self.connection_lost = True
             self.connected = False
             self.running = False
@@ -113,34 +153,59 @@ class GameClient:
         
     def _ping_loop(self):
         while self.running and self.connected:
-            current_time = time.time()
-            
-            if current_time - self.last_ping >= 5.0:
-                if self.send_message({'type': 'ping'}):
-                    self.last_ping = current_time
-                else:
-                    self._handle_connection_lost()
-                    break
+            if not self._check_ping(time.time()):
+                break
+            time.sleep(min(1.0, PING_INTERVAL))
             
-            if self.enable_timeout_check and self.last_pong > 0 and current_time - self.last_pong > self.connection_timeout:
+    def _check_ping(self, current_time):
+        self.fragments.expire()
+        if current_time - self.last_ping >= PING_INTERVAL:
+            self.ping_seq += 1
+            ping = {'type': 'ping', 'seq': self.ping_seq}
+            if self.stats.rtt is not None:
+                # Let the server see our RTT too
+                ping['rtt'] = min(int(self.stats.rtt * 1000), 0xFFFF)
+            # Pings whose pong never came are forgotten after a few intervals
+            self.ping_times = {seq: sent for seq, sent in self.ping_times.items() if current_time - sent < 10.0}
+            self.ping_times[self.ping_seq] = current_time
+            if self.send_message(ping):
+                self.last_ping = current_time
+            else:
                 self._handle_connection_lost()
-                break
-                
-            time.sleep(1.0)
+                return False
+        
+        if self.enable_timeout_check and self.last_pong > 0 and current_time - self.last_pong > self.connection_timeout:
+            self._handle_connection_lost()
+            return False
+        return True
             
     def _handle_message(self, message):
         msg_type = message.get('type')
-        print(f"Client handling message type: {msg_type}")
         
-        if msg_type == 'welcome':
+        if msg_type == 'reliable_ack':
+            self.reliable.acknowledge(message.get('ack', 0), message.get('ack_bits', 0))
+            return
+        elif msg_type == 'welcome':
             self.player_id = message.get('player_id')
             self.server_code = message.get('server_code')
+            self.room = message.get('room')
             self.connected = True
             self.last_pong = time.time()
-            print(f"Client received welcome, assigned player_id: {self.player_id}")
+            log.info("Client received welcome, assigned player_id: %s", self.player_id)
+        elif msg_type == 'player_assignment':
+            self.assigned_player_id = message.get('player_id')
+            log.info("Client assigned to player slot %s", self.assigned_player_id)
         elif msg_type == 'pong':
             self.last_pong = time.time()
-            print("Client received pong")
+            sent = self.ping_times.pop(message.get('seq'), None)
+            if sent is not None:
+                self.stats.add_rtt_sample(self.last_pong - sent)
+        elif msg_type == 'game_state_update':
+            seq = message.get('data', {}).get('seq')
+            if seq is not None:
+                self.stats.record_sequence('snapshots', seq)
+        elif msg_type == 'input_commands':
+            self.stats.record_sequence('input', message.get('seq', 0))
             
         if msg_type in self.message_handlers:
             self.message_handlers[msg_type](message)
@@ -148,25 +213,96 @@ class GameClient:
     def send_message(self, message):
         if self.socket and self.server_address:
             try:
-                data = json.dumps(message).encode('utf-8')
+                data = encode_message(message)
                 
                 send_address = list(self.server_address)
                 if send_address[0] in ['localhost', '127.0.0.1']:
                     send_address[0] = '127.0.0.1'
                 
-                bytes_sent = self.socket.sendto(data, tuple(send_address))
-                print(f"Client sent {bytes_sent} bytes to server: {message.get('type', 'unknown')}")
+                self.stats.message_out(message.get('type', 'unknown'), len(data))
+                if message.get('type') in RELIABLE_MESSAGE_TYPES:
+                    data = self.reliable.wrap(data, rtt=self.stats.rtt)
+                    self._schedule_reliable()
+                for datagram in pack_datagrams([data]):
+                    self.socket.sendto(datagram, tuple(send_address))
+                    self.stats.datagram_out(len(datagram))
+                if log.packets_enabled:
+                    log.packet('send', self.server_address, message.get('type', 'unknown'), len(data))
                 return True
             except Exception as e:
-                print(f"Client send error: {e}")
+                log.error("Client send error: %s", e)
                 return False
         return False
         
+    def queue_message(self, message):
+        try:
+            data = encode_message(message)
+        except Exception as e:
+            log.error("Client encode error: %s", e)
+            return False
+        self.stats.message_out(message.get('type', 'unknown'), len(data))
+        if message.get('type') in RELIABLE_MESSAGE_TYPES:
+            data = self.reliable.wrap(data, rtt=self.stats.rtt)
+            self._schedule_reliable()
+        with self.outgoing_lock:
+            self.outgoing.append(data)
+        if log.packets_enabled:
+            log.packet('send', self.server_address, message.get('type', 'unknown'), len(data))
+        return True
+        
+    def flush(self):
+        """Send the queued messages, coalesced into as few datagrams as fit.
+
+        An owed reliable_ack and any due reliable resends go out in the same datagrams.
+        """
+        with self.outgoing_lock:
+            outgoing, self.outgoing = self.outgoing, []
+        outgoing.extend(self._reliable_upkeep(time.monotonic()))
+        if not outgoing:
+            return True
+        return self._send_payloads(outgoing)
+        
+    def _reliable_upkeep(self, current_time, ack_delay=0.0):
+        payloads = self.reliable.due(current_time)
+        if self.reliable.ack_due(current_time, ack_delay):
+            ack = self.reliable.take_ack()
+            if ack:
+                payloads.append(encode_message(ack))
+        return payloads
+        
+    def _service_reliable(self):
+        # Resends and acks that no flush has carried yet; acks wait briefly for a flush to ride along with
+        payloads = self._reliable_upkeep(time.monotonic(), RELIABLE_ACK_DELAY)
+        if payloads:
+            self._send_payloads(payloads)
+        
+    def _schedule_reliable(self):
+        """Hook for transports without a polling receive loop to arrange a _service_reliable call."""
+        
+    def _send_payloads(self, outgoing):
+        if not (self.socket and self.server_address):
+            return False
+        send_address = list(self.server_address)
+        if send_address[0] in ['localhost', '127.0.0.1']:
+            send_address[0] = '127.0.0.1'
+        try:
+            for datagram in pack_datagrams(outgoing):
+                self.socket.sendto(datagram, tuple(send_address))
+                self.stats.datagram_out(len(datagram))
+        except Exception as e:
+            log.error("Client send error: %s", e)
+            return False
+        return True
+        
+    def get_network_stats(self):
+        """RTT, jitter, loss and traffic for the link to the server (see PeerStats.summary)."""
+        return self.stats.summary()
+        
     def register_handler(self, message_type, handler):
         self.message_handlers[message_type] = handler
         
     def disconnect(self):
-        print("Client disconnecting")
+        log.info("Client disconnecting")
         self.running = False
         self.connected = False
         if self.socket:
@@ -200,7 +336,7 @@ class GameClient:
         
     def check_connection_timeout(self):
         if not self.is_connection_healthy() and not self.connection_lost:
-            print("Client connection timeout detected")
+            log.warning("Client connection timeout detected")
             self._handle_connection_lost()
             
     def enable_timeout_checking(self):
@@ -1,10 +1,30 @@
 import socket
 import threading
-import json
 import time
 import random
 import string
 import os
+from src.network.protocol import encode_message, decode_datagram, pack_datagrams, FragmentAssembler, ProtocolError
+from src.network.net_log import NetLogger
+from src.network.net_stats import PeerStats
+from src.network.reliable import ReliableChannel, RELIABLE_MESSAGE_TYPES
+from src.network.timing_wheel import TimingWheel
+from src.network.batch_send import BatchSender
+from src.config.settings import (MAX_PLAYERS, SERVER_MAX_ROOMS, RECEIVE_BUFFER_SIZE, RELIABLE_POLL_INTERVAL,
+                                 CLIENT_TIMEOUT, CLIENT_TIMEOUT_RESOLUTION, NETWORK_SENDMMSG)
+
+log = NetLogger('duel.network.server')
+
+class Room:
+    def __init__(self, code, max_clients=MAX_PLAYERS):
+        self.code = code
+        self.max_clients = max_clients
+        self.clients = {}
+        self.game_state = {'players': {}, 'projectiles': [], 'game_status': 'waiting'}
+        self.players_ready = False
+        
+    def is_full(self):
+        return len(self.clients) >= self.max_clients
 
 class GameServer:
     def __init__(self, host=None, port=0):
@@ -13,12 +33,47 @@ class GameServer:
         
         self.is_localhost_server = False
         self.socket = None
+        self.sender = None
         self.running = False
-        self.clients = {}
         self.client_counter = 0
-        self.game_state = {'players': {}, 'projectiles': [], 'game_status': 'waiting'}
         self.server_code = None
-        self.players_ready = False
+        self.message_handlers = {}
+        # The default room serves clients that connect without a room code (the classic one-match server)
+        self.default_room = Room(None)
+        self.rooms = {}
+        self.client_index = {}
+        self.client_rooms = {}
+        # Encoded messages waiting for the next flush, per destination address
+        self.outgoing = {}
+        self.outgoing_lock = threading.Lock()
+        self.fragments = FragmentAssembler()
+        self.recv_buffer = memoryview(bytearray(RECEIVE_BUFFER_SIZE))
+        # Connection quality per connected client address
+        self.peer_stats = {}
+        # Reliable channel per connected client address, and the addresses whose channel has
+        # unacked messages or owes an ack (so flushes only visit those)
+        self.reliable = {}
+        self.reliable_active = set()
+        # Timeout deadline per client id. Packets only refresh last_seen; a client is looked at
+        # again when its deadline comes up, so expiry costs nothing per packet or per idle client.
+        self.timeouts = TimingWheel(CLIENT_TIMEOUT_RESOLUTION, CLIENT_TIMEOUT)
+        self.next_timeout_check = 0
+        
+    @property
+    def clients(self):
+        return self.default_room.clients
+        
+    @property
+    def game_state(self):
+        return self.default_room.game_state
+        
+    @property
+    def players_ready(self):
+        return self.default_room.players_ready
+        
+    @players_ready.setter
+    def players_ready(self, value):
+        self.default_room.players_ready = value
         
     def _get_local_ip_for_binding(self):
         try:
@@ -51,15 +106,15 @@ class GameServer:
     def _encode_ip_to_code(self, ip_address, port):
         """Encode IP and port into 6-character code - SYMMETRICAL"""
         try:
-            print(f"Encoding IP: {ip_address}:{port}")
+            log.debug("Encoding IP: %s:%s", ip_address, port)
             
             if ip_address == 'localhost' or ip_address == '127.0.0.1':
-                print(f"Using LOCALL for {ip_address}:{port}")
+                log.debug("Using LOCALL for %s:%s", ip_address, port)
                 return 'LOCALL'
             
             parts = ip_address.split('.')
             if len(parts) != 4:
-                print("Invalid IP format, using LOCALL")
+                log.warning("Invalid IP format, using LOCALL")
                 return 'LOCALL'
             
             third_octet = int(parts[2])
@@ -79,11 +134,11 @@ class GameServer:
                 code = chars[temp % 36] + code
                 temp //= 36
             
-            print(f"Generated code: {code}")
+            log.debug("Generated code: %s", code)
             return code
             
         except Exception as e:
-            print(f"Error encoding IP: {e}")
+            log.warning("Error encoding IP: %s", e)
             return 'LOCALL'
     def start(self):
         try:
@@ -92,122 +147,313 @@ class GameServer:
             
             if self.is_localhost_server and not self.port:
                 self.port = 12345
-                print("Localhost-only server - using port 12345")
+                log.info("Localhost-only server - using port 12345")
                 
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.socket.bind((self.host, self.port))
+            self.socket = self._create_socket()
+            self.sender = BatchSender(self.socket, NETWORK_SENDMMSG)
             
             if self.port == 0:
                 self.port = self.socket.getsockname()[1]
             self.server_code = self._generate_server_code()
+            self.default_room.code = self.server_code
+            self.rooms[self.server_code] = self.default_room
             self.running = True
-            print(f"UDP Game server started on {self.host}:{self.port}")
-            print(f"Server code: {self.server_code}")
+            log.info("UDP Game server started on %s:%s", self.host, self.port)
+            log.info("Server code: %s", self.server_code)
             self._listen_for_messages()
         except Exception as e:
-            print(f"Failed to start server: {e}")
+            log.error("Failed to start server: %s", e)
             return False
             
+    def _create_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((self.host, self.port))
+        return sock
+            
     def _listen_for_messages(self):
         receive_thread = threading.Thread(target=self._receive_loop)
         receive_thread.daemon = True
         receive_thread.start()
-        cleanup_thread = threading.Thread(target=self._cleanup_loop)
-        cleanup_thread.daemon = True
-        cleanup_thread.start()
         
     def _receive_loop(self):
-        print("Server receive loop started")
+        log.debug("Server receive loop started")
+        self.socket.settimeout(RELIABLE_POLL_INTERVAL)
         while self.running:
             try:
-                self.socket.settimeout(1.0)
-                data, address = self.socket.recvfrom(1024)
-                print(f"Server received data from {address}: {data}")
-                try:
-                    message = json.loads(data.decode('utf-8'))
-                    print(f"Server parsed message: {message}")
-                    self._handle_message(message, address)
-                except json.JSONDecodeError:
-                    print(f"Server: Invalid JSON from {address}: {data}")
+                size, address = self.socket.recvfrom_into(self.recv_buffer)
+                self._process_datagram(self.recv_buffer[:size], address)
+                self._check_timeouts(time.time())
+                self.flush_outgoing()
             except socket.timeout:
+                # Idle: still expire clients and send reliable resends that have come due
+                self._check_timeouts(time.time())
+                if self.reliable_active or self.outgoing:
+                    self.flush_outgoing()
                 continue
             except Exception as e:
                 if self.running:
-                    print(f"Server receive error: {e}")
-        print("Server receive loop ended")
+                    log.error("Server receive error: %s", e)
+        log.debug("Server receive loop ended")
         
-    def _cleanup_loop(self):
-        while self.running:
-            current_time = time.time()
-            inactive_clients = []
-            for client_id, (address, last_seen) in self.clients.items():
-                if current_time - last_seen > 10.0:
-                    inactive_clients.append(client_id)
-            for client_id in inactive_clients:
+    def _process_datagram(self, data, address):
+        stats = self.peer_stats.get(address)
+        sizes = [] if stats is not None else None
+        try:
+            messages = decode_datagram(data, self.fragments, address, sizes)
+        except ProtocolError as e:
+            log.warning("Invalid packet from %s: %s", address, e)
+            return
+        if stats is not None:
+            stats.datagram_in(len(data))
+            for message, size in zip(messages, sizes):
+                stats.message_in(message.get('type'), size)
+        for message in messages:
+            if log.packets_enabled:
+                log.packet('recv', address, message.get('type'), len(data))
+            if 'reliable_seq' in message:
+                channel = self.reliable.get(address)
+                if channel is None:
+                    continue
+                for delivered in channel.receive(message):
+                    self._handle_message(delivered, address)
+                self._mark_reliable(address)
+            else:
+                self._handle_message(message, address)
+        
+    def _check_timeouts(self, current_time):
+        """Disconnect clients silent for CLIENT_TIMEOUT seconds; called from the network loop."""
+        if current_time < self.next_timeout_check:
+            return
+        self.next_timeout_check = current_time + CLIENT_TIMEOUT_RESOLUTION
+        self.fragments.expire()
+        for client_id in self.timeouts.advance(current_time):
+            room = self.client_rooms.get(client_id)
+            if room is None or client_id not in room.clients:
+                continue
+            last_seen = room.clients[client_id][1]
+            if current_time - last_seen > CLIENT_TIMEOUT:
                 self._disconnect_client(client_id)
-            time.sleep(5.0)
+            else:
+                self.timeouts.schedule(client_id, last_seen + CLIENT_TIMEOUT)
+            
     def _handle_message(self, message, address):
         msg_type = message.get('type')
         current_time = time.time()
-        client_id = None
-        for cid, (addr, _) in self.clients.items():
-            if addr == address:
-                client_id = cid
-                break
+        entry = self.client_index.get(address)
         if msg_type == 'connect':
-            if client_id is None and len(self.clients) < 2:
-                client_id = self.client_counter
-                self.client_counter += 1
-                self.clients[client_id] = (address, current_time)
-                print(f"Client {client_id} connected from {address}")
-                welcome_msg = {'type': 'welcome', 'player_id': client_id, 'server_code': self.server_code}
-                self._send_to_address(address, welcome_msg)
-                if len(self.clients) == 2 and not self.players_ready:
-                    self.players_ready = True
-                    self.game_state['game_status'] = 'playing'
-                    self._broadcast({'type': 'game_start'})
-            elif client_id is not None:
-                self.clients[client_id] = (address, current_time)
-        elif client_id is not None:
-            self.clients[client_id] = (address, current_time)
-            if msg_type == 'player_update':
-                self.game_state['players'][client_id] = message.get('data', {})
-                self._broadcast_to_others(client_id, message)
-            elif msg_type in ['player_input', 'game_state_update', 'countdown_start', 'countdown_cancel', 'restart_request', 'return_to_lobby', 'return_to_main_menu', 'ready_ping', 'ready_pong']:
-                self._broadcast(message)
-            elif msg_type == 'shoot':
-                self._broadcast_to_others(client_id, message)
-            elif msg_type == 'ping':
-                self._send_to_address(address, {'type': 'pong'})
+            if entry is None:
+                self._connect_client(address, message.get('room'), current_time)
+            else:
+                # A retried connect: our welcome was lost
+                room, client_id = entry
+                room.clients[client_id] = (address, current_time)
+                self._send_welcome(address, room, client_id)
+            return
+        if entry is None:
+            return
+        room, client_id = entry
+        room.clients[client_id] = (address, current_time)
+        if msg_type == 'reliable_ack':
+            self.reliable[address].acknowledge(message.get('ack', 0), message.get('ack_bits', 0))
+            return
+        if msg_type == 'input_commands':
+            self.peer_stats[address].record_sequence('input', message.get('seq', 0))
+        elif msg_type == 'ping' and message.get('rtt') is not None:
+            self.peer_stats[address].add_rtt_sample(message['rtt'] / 1000.0)
+        if msg_type in self.message_handlers:
+            self.message_handlers[msg_type](message, client_id)
+        elif msg_type == 'player_update':
+            room.game_state['players'][client_id] = message.get('data', {})
+            self._broadcast_to_others(client_id, message, room)
+        elif msg_type in ['player_input', 'input_commands', 'game_state_update', 'countdown_start', 'countdown_cancel', 'restart_request', 'return_to_lobby', 'return_to_main_menu', 'ready_ping', 'ready_pong', 'snapshot_ack']:
+            self._broadcast(message, room)
+        elif msg_type == 'shoot':
+            self._broadcast_to_others(client_id, message, room)
+        elif msg_type == 'ping':
+            pong = {'type': 'pong'}
+            if message.get('seq') is not None:
+                pong['seq'] = message['seq']
+            self._send_to_address(address, pong)
+            
+    def _connect_client(self, address, room_code, current_time):
+        room = self.rooms.get(room_code) if room_code else self.default_room
+        if room is None:
+            if len(self.rooms) >= SERVER_MAX_ROOMS:
+                log.warning("Rejecting %s: room limit of %d reached", address, SERVER_MAX_ROOMS)
+                return
+            room = Room(room_code)
+            self.rooms[room_code] = room
+            log.info("Created room %s", room_code)
+        if room.is_full():
+            return
+        client_id = self.client_counter
+        self.client_counter += 1
+        room.clients[client_id] = (address, current_time)
+        self.client_index[address] = (room, client_id)
+        self.client_rooms[client_id] = room
+        self.peer_stats[address] = PeerStats()
+        self.reliable[address] = ReliableChannel()
+        self.timeouts.schedule(client_id, current_time + CLIENT_TIMEOUT)
+        log.info("Client %s connected from %s to room %s", client_id, address, room.code)
+        self._send_welcome(address, room, client_id)
+        if 'client_connected' in self.message_handlers:
+            self.message_handlers['client_connected']({'type': 'client_connected'}, client_id)
+        if room.is_full() and not room.players_ready:
+            room.players_ready = True
+            room.game_state['game_status'] = 'playing'
+            self._broadcast({'type': 'game_start'}, room)
+            
+    def _send_welcome(self, address, room, client_id):
+        self._send_to_address(address, {'type': 'welcome', 'player_id': client_id, 'server_code': self.server_code,
+                                        'room': room.code})
+            
     def _send_to_address(self, address, message):
         try:
-            data = json.dumps(message).encode('utf-8')
-            bytes_sent = self.socket.sendto(data, address)
-            print(f"Server sent {bytes_sent} bytes to {address}: {message.get('type', 'unknown')}")
-            print(f"Message content: {message}")
+            data = encode_message(message)
         except Exception as e:
-            print(f"Error sending to {address}: {e}")
+            log.error("Error encoding %s for %s: %s", message.get('type'), address, e)
+            return
+        self._queue_datagram(address, data, message.get('type', 'unknown'))
+        
+    def _queue_datagram(self, address, data, msg_type):
+        if msg_type in RELIABLE_MESSAGE_TYPES:
+            channel = self.reliable.get(address)
+            if channel is not None:
+                stats = self.peer_stats.get(address)
+                data = channel.wrap(data, rtt=stats.rtt if stats else None)
+                self._mark_reliable(address)
+        with self.outgoing_lock:
+            queued = self.outgoing.get(address)
+            if queued is None:
+                self.outgoing[address] = [data]
+            else:
+                queued.append(data)
+        stats = self.peer_stats.get(address)
+        if stats is not None:
+            stats.message_out(msg_type, len(data))
+        if log.packets_enabled:
+            log.packet('send', address, msg_type, len(data))
+            
+    def _mark_reliable(self, address):
+        with self.outgoing_lock:
+            self.reliable_active.add(address)
+        self._schedule_reliable()
+        
+    def _schedule_reliable(self):
+        """Hook for transports without a polling receive loop to arrange a flush_outgoing call."""
+        
+    def _reliable_upkeep(self, current_time):
+        # Owed acks and due resends are queued so they share datagrams with the rest of the flush
+        for address in list(self.reliable_active):
+            channel = self.reliable.get(address)
+            if channel is None:
+                self.reliable_active.discard(address)
+                continue
+            payloads = channel.due(current_time)
+            ack = channel.take_ack()
+            if ack:
+                payloads.append(encode_message(ack))
+            with self.outgoing_lock:
+                if payloads:
+                    self.outgoing.setdefault(address, []).extend(payloads)
+                if not channel.busy():
+                    self.reliable_active.discard(address)
+            
+    def flush_outgoing(self):
+        """Send everything queued since the last flush, coalesced into as few datagrams per peer as fit.
+
+        Owed reliable acks and due reliable resends go out with it.
+        """
+        if self.reliable_active:
+            self._reliable_upkeep(time.monotonic())
+        with self.outgoing_lock:
+            if not self.outgoing:
+                return
+            outgoing, self.outgoing = self.outgoing, {}
+        # Every peer's datagrams go to the sender as one batch; a broadcast queued the
+        # same bytes object for each recipient, so it is not copied per peer
+        batch = []
+        for address, payloads in outgoing.items():
+            try:
+                datagrams = pack_datagrams(payloads)
+            except ProtocolError as e:
+                log.error("Error sending to %s: %s", address, e)
+                continue
+            stats = self.peer_stats.get(address)
+            for datagram in datagrams:
+                batch.append((datagram, address))
+                if stats is not None:
+                    stats.datagram_out(len(datagram))
+        self.sender.send(batch, self._send_failed)
+        
+    def _send_failed(self, address, error):
+        log.error("Error sending to %s: %s", address, error)
+            
+    def send_to_client(self, client_id, message):
+        room = self.client_rooms.get(client_id)
+        if room and client_id in room.clients:
+            self._send_to_address(room.clients[client_id][0], message)
+            
+    def register_handler(self, message_type, handler):
+        self.message_handlers[message_type] = handler
+        
+    def get_client_stats(self, client_id):
+        """RTT (as reported by the client), jitter, input loss and traffic for one client, or None."""
+        room = self.client_rooms.get(client_id)
+        if room is None or client_id not in room.clients:
+            return None
+        stats = self.peer_stats.get(room.clients[client_id][0])
+        return stats.summary() if stats else None
+        
+    def get_network_stats(self):
+        return {client_id: self.get_client_stats(client_id) for client_id in list(self.client_rooms)}
+        
+    def get_client_room(self, client_id):
+        return self.client_rooms.get(client_id)
+        
+    def broadcast(self, message, room=None):
+        self._broadcast(message, room)
             
-    def _broadcast(self, message):
-        for client_id, (address, _) in list(self.clients.items()):
-            self._send_to_address(address, message)
+    def _broadcast(self, message, room=None):
+        self._broadcast_to_others(None, message, room)
             
-    def _broadcast_to_others(self, sender_id, message):
-        for client_id, (address, _) in list(self.clients.items()):
-            if client_id != sender_id:
-                self._send_to_address(address, message)
+    def _broadcast_to_others(self, sender_id, message, room=None):
+        # Serialize once and queue the same bytes for every recipient
+        room = room or self.default_room
+        data = None
+        msg_type = message.get('type', 'unknown')
+        for client_id, (address, _) in list(room.clients.items()):
+            if client_id == sender_id:
+                continue
+            if data is None:
+                try:
+                    data = encode_message(message)
+                except Exception as e:
+                    log.error("Error encoding %s: %s", msg_type, e)
+                    return
+            self._queue_datagram(address, data, msg_type)
                 
     def _disconnect_client(self, client_id):
-        if client_id in self.clients:
-            address = self.clients[client_id][0]
-            del self.clients[client_id]
-            print(f"Client {client_id} at {address} disconnected due to timeout")
-            if self.players_ready:
-                self.players_ready = False
-                self.game_state['game_status'] = 'waiting'
-                print("Game state reset due to client disconnection")
-            self._broadcast({'type': 'player_disconnected', 'player_id': client_id, 'reason': 'timeout'})
-            print(f"Remaining clients: {len(self.clients)}")
+        room = self.client_rooms.pop(client_id, None)
+        if room is None or client_id not in room.clients:
+            return
+        address = room.clients.pop(client_id)[0]
+        self.timeouts.cancel(client_id)
+        self.client_index.pop(address, None)
+        self.peer_stats.pop(address, None)
+        self.reliable.pop(address, None)
+        log.info("Client %s at %s disconnected due to timeout", client_id, address)
+        if room.players_ready:
+            room.players_ready = False
+            room.game_state['game_status'] = 'waiting'
+            log.info("Game state reset due to client disconnection")
+        self._broadcast({'type': 'player_disconnected', 'player_id': client_id, 'reason': 'timeout'}, room)
+        if 'client_disconnected' in self.message_handlers:
+            self.message_handlers['client_disconnected']({'type': 'client_disconnected'}, client_id)
+        if not room.clients and room is not self.default_room:
+            self.rooms.pop(room.code, None)
+            log.info("Closed empty room %s", room.code)
+        log.info("Remaining clients in room %s: %d", room.code, len(room.clients))
             
     def stop(self):
         self.running = False
@@ -216,7 +462,7 @@ class GameServer:
                 self.socket.close()
             except:
                 pass
-        print("UDP Server stopped")
+        log.info("UDP Server stopped")
         
     def get_server_info(self):
         actual_ip = self._get_local_ip()
@@ -227,7 +473,9 @@ class GameServer:
             'port': self.port,
             'code': self.server_code,
             'clients': len(self.clients),
-            'ready': self.players_ready
+            'ready': self.players_ready,
+            'rooms': len(self.rooms),
+            'total_clients': len(self.client_rooms)
         }
         
         # If this is a localhost server (LOCALL), override the port to report
@@ -0,0 +1,60 @@
+import math
+
+
+class TimingWheel:
+    """Deadlines hashed into a ring of time slots so expiry only visits due keys.
+
+    schedule() and cancel() are O(1). advance() walks the slots that have passed since
+    the last call and returns the keys whose deadline has been reached, so its cost
+    depends on how many keys expire rather than how many are scheduled. A deadline
+    further out than the ring covers waits in its slot for another lap.
+    """
+
+    def __init__(self, resolution, horizon):
+        self.resolution = resolution
+        self.slots = [[] for _ in range(int(math.ceil(horizon / resolution)) + 1)]
+        self.current_tick = None
+        # key -> (deadline, tick of the slot holding its live entry); slot entries for other ticks are stale
+        self.deadlines = {}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def schedule(self, key, deadline):
+        """Set key's deadline, replacing any earlier one."""
+        tick = int(deadline // self.resolution)
+        if self.current_tick is not None and tick < self.current_tick:
+            tick = self.current_tick
+        self.deadlines[key] = (deadline, tick)
+        self.slots[tick % len(self.slots)].append((key, tick))
+
+    def cancel(self, key):
+        self.deadlines.pop(key, None)
+
+    def advance(self, current_time):
+        """Remove and return the keys due by current_time, to within one resolution step."""
+        target = int(current_time // self.resolution)
+        if self.current_tick is None:
+            self.current_tick = target
+        expired = []
+        # A slot is due once its whole tick has passed; each is visited at most once per call
+        for tick in range(self.current_tick, min(target, self.current_tick + len(self.slots))):
+            index = tick % len(self.slots)
+            bucket = self.slots[index]
+            if not bucket:
+                continue
+            self.slots[index] = []
+            for key, key_tick in bucket:
+                entry = self.deadlines.get(key)
+                if entry is None or entry[1] != key_tick:
+                    continue
+                if key_tick < target:
+                    del self.deadlines[key]
+                    expired.append(key)
+                else:
+                    self.slots[index].append((key, key_tick))
+        self.current_tick = max(self.current_tick, target)
+        return expired
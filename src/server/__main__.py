@@ -0,0 +1,38 @@
+import argparse
+import sys
+from src.config.settings import SERVER_TICK_RATE
+from src.server.dedicated_server import run_dedicated_server
+from src.network.sharding import ShardSupervisor
+from src.network.net_log import configure_logging
+
+
+def run_sharded_relay(port, workers):
+    supervisor = ShardSupervisor(port=port, workers=workers)
+    if not supervisor.start():
+        return 1
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless Duel Game server")
+    parser.add_argument('--port', type=int, default=0, help="UDP port to bind (default: any free port)")
+    parser.add_argument('--tick-rate', type=int, default=SERVER_TICK_RATE, help="Simulation ticks per second")
+    parser.add_argument('--transport', choices=('threads', 'asyncio'), default='threads',
+                        help="Network transport: blocking receive threads or a single asyncio event loop")
+    parser.add_argument('--shard-workers', type=int, default=0,
+                        help="Instead of a simulation, run a multi-room relay sharded over N worker processes")
+    args = parser.parse_args()
+    configure_logging()
+    if args.shard_workers:
+        return run_sharded_relay(args.port, args.shard_workers)
+    return run_dedicated_server(port=args.port, tick_rate=args.tick_rate, transport=args.transport)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import asyncio
+import os
+import signal
+import time
+from collections import deque
+import pygame
+from src.common.entities.player import Player
+from src.common.entities.map import Map
+from src.server.game_logic.game_state import GameState, GameStateType
+from src.network.socket_server import GameServer
+from src.network.async_transport import AsyncGameServer
+from src.network.snapshots import SnapshotEncoder
+from src.network.input_commands import InputCommandReceiver, apply_input_command
+from src.network.net_log import NetLogger
+from src.server.game_logic.lag_compensation import HitboxHistory
+from src.server.game_logic.projectile_system import create_projectile_system
+from src.config.settings import (PLAYER_BLUE, PLAYER_RED, SERVER_TICK_RATE, SERVER_SNAPSHOT_RATE,
+                                 SERVER_MAX_FRAME_TIME, MATCH_COUNTDOWN_DURATION, LAG_COMPENSATION,
+                                 PROJECTILE_ENGINE)
+
+log = NetLogger('duel.server.dedicated')
+
+
+def init_headless_pygame():
+    """Initialise pygame without a window or audio device so entities can load their assets."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+
+class DedicatedServer:
+    def __init__(self, port=0, tick_rate=SERVER_TICK_RATE, snapshot_rate=SERVER_SNAPSHOT_RATE, server=None):
+        self.server = server or GameServer(port=port)
+        self.tick_rate = tick_rate
+        self.tick_interval = 1.0 / tick_rate
+        self.ticks_per_snapshot = max(1, round(tick_rate / snapshot_rate))
+        self.tick_count = 0
+        self.running = False
+        self.pending_messages = deque()
+        self.slots = {}
+        self.snapshot_encoders = {}
+        self.input_receivers = {}
+        self.hitbox_history = HitboxHistory() if LAG_COMPENSATION else None
+        self.match_started = False
+        self.countdown_end_time = None
+        self.projectile_id_counter = 0
+
+        self.game_state = GameState()
+        self.game_state.set_state(GameStateType.WAITING)
+        self.game_state.game_map = Map()
+        if PROJECTILE_ENGINE == 'numpy':
+            self.game_state.projectile_system = create_projectile_system()
+        self.players = {}
+        for player_id, image in ((PLAYER_BLUE, "player_blue.png"), (PLAYER_RED, "player_red.png")):
+            spawn = self.game_state.game_map.get_spawn_position(player_id)
+            self.players[player_id] = Player(spawn[0], spawn[1], image, player_id)
+            self.game_state.add_player(self.players[player_id])
+
+        # Network handlers may run on a receive thread; they only enqueue, the tick loop applies
+        for msg_type in ('client_connected', 'client_disconnected', 'player_input', 'input_commands',
+                         'restart_request', 'snapshot_ack'):
+            self.server.register_handler(msg_type, self._enqueue_message)
+
+    def _enqueue_message(self, message, client_id):
+        self.pending_messages.append((message, client_id))
+
+    def start(self):
+        self.server.start()
+        if not self.server.running:
+            return False
+        self.running = True
+        log.info("Dedicated server running at %d ticks/s, code %s", self.tick_rate, self.server.server_code)
+        return True
+
+    def run(self):
+        accumulator = 0.0
+        previous = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            accumulator += min(now - previous, SERVER_MAX_FRAME_TIME)
+            previous = now
+            while accumulator >= self.tick_interval:
+                self._tick(self.tick_interval)
+                accumulator -= self.tick_interval
+            time.sleep(max(0.0, self.tick_interval - accumulator))
+
+    async def run_async(self):
+        # Same fixed-step loop, but yields to the event loop so the asyncio transport can receive
+        accumulator = 0.0
+        previous = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            accumulator += min(now - previous, SERVER_MAX_FRAME_TIME)
+            previous = now
+            while accumulator >= self.tick_interval:
+                self._tick(self.tick_interval)
+                accumulator -= self.tick_interval
+            await asyncio.sleep(max(0.0, self.tick_interval - accumulator))
+
+    def stop(self):
+        self.running = False
+        self.server.stop()
+
+    def _tick(self, dt):
+        while self.pending_messages:
+            message, client_id = self.pending_messages.popleft()
+            self._process_message(message, client_id)
+
+        if self.countdown_end_time is not None and time.time() >= self.countdown_end_time:
+            self.countdown_end_time = None
+            self._start_match()
+
+        if self.game_state.current_state == GameStateType.PLAYING:
+            for player in self.game_state.players:
+                player.update(dt, self.game_state.game_map)
+            if self.hitbox_history:
+                self.hitbox_history.record(pygame.time.get_ticks(), self.game_state.players)
+            self.game_state.update_spatial_index()
+            self.game_state.update_projectiles(dt, self.hitbox_history)
+            self.game_state.handle_respawn_logic()
+            self.game_state.check_win_condition()
+
+        self.tick_count += 1
+        if self.match_started and self.tick_count % self.ticks_per_snapshot == 0:
+            self._broadcast_snapshot()
+        self.server.flush_outgoing()
+
+    def _process_message(self, message, client_id):
+        msg_type = message.get('type')
+        if msg_type == 'client_connected':
+            self._seat_client(client_id)
+        elif msg_type == 'client_disconnected':
+            self._unseat_client(client_id)
+        elif msg_type == 'snapshot_ack':
+            if client_id in self.snapshot_encoders:
+                self.snapshot_encoders[client_id].acknowledge(message.get('seq'))
+        elif msg_type == 'restart_request':
+            if self.game_state.current_state == GameStateType.GAME_OVER:
+                self.server.broadcast({'type': 'return_to_lobby'})
+                self._reset_match()
+                self._maybe_start_countdown()
+        elif msg_type == 'player_input' and client_id in self.slots:
+            self._apply_input(self.players[self.slots[client_id]], message.get('data', {}))
+        elif msg_type == 'input_commands' and client_id in self.slots:
+            player = self.players[self.slots[client_id]]
+            rewind = 0
+            if self.hitbox_history:
+                view_time = self.snapshot_encoders[client_id].sent_time(message.get('view_seq'))
+                rewind = self.hitbox_history.rewind_for(view_time, pygame.time.get_ticks(),
+                                                        message.get('view_delay'))
+            for buttons in self.input_receivers[client_id].receive(message):
+                if self.game_state.current_state == GameStateType.PLAYING:
+                    if apply_input_command(player, buttons) and player.can_shoot:
+                        self._fire(player, rewind)
+
+    def _seat_client(self, client_id):
+        taken = set(self.slots.values())
+        free = [pid for pid in (PLAYER_BLUE, PLAYER_RED) if pid not in taken]
+        if not free:
+            return
+        self.slots[client_id] = free[0]
+        self.snapshot_encoders[client_id] = SnapshotEncoder()
+        self.input_receivers[client_id] = InputCommandReceiver()
+        self.server.send_to_client(client_id, {'type': 'player_assignment', 'player_id': free[0]})
+        log.info("Client %s seated as player %s", client_id, free[0])
+        self._maybe_start_countdown()
+
+    def _unseat_client(self, client_id):
+        self.slots.pop(client_id, None)
+        self.snapshot_encoders.pop(client_id, None)
+        self.input_receivers.pop(client_id, None)
+        self._reset_match()
+
+    def _maybe_start_countdown(self):
+        if len(self.slots) == 2 and not self.match_started and self.countdown_end_time is None:
+            self.server.broadcast({'type': 'countdown_start', 'duration': MATCH_COUNTDOWN_DURATION})
+            self.countdown_end_time = time.time() + MATCH_COUNTDOWN_DURATION
+
+    def _start_match(self):
+        if len(self.slots) < 2:
+            return
+        self.game_state.reset()
+        if self.hitbox_history:
+            self.hitbox_history.clear()
+        for player_id, player in self.players.items():
+            spawn = self.game_state.game_map.get_spawn_position(player_id)
+            player.respawn(spawn[0], spawn[1])
+            player.move(0, 0)
+        for encoder in self.snapshot_encoders.values():
+            encoder.reset()
+        self.game_state.start_timer(pygame.time.get_ticks())
+        self.match_started = True
+        log.info("Match started")
+
+    def _reset_match(self):
+        self.match_started = False
+        self.countdown_end_time = None
+        self.game_state.reset()
+        self.game_state.set_state(GameStateType.WAITING)
+
+    def _apply_input(self, player, data):
+        input_type = data.get('type')
+        if input_type == 'pause':
+            if self.game_state.current_state == GameStateType.PLAYING:
+                self.game_state.set_state(GameStateType.PAUSED)
+            elif self.game_state.current_state == GameStateType.PAUSED:
+                self.game_state.set_state(GameStateType.PLAYING)
+        elif input_type == 'resume':
+            if self.game_state.current_state == GameStateType.PAUSED:
+                self.game_state.set_state(GameStateType.PLAYING)
+        elif input_type == 'quit_to_menu':
+            self.server.broadcast({'type': 'return_to_main_menu'})
+            self._reset_match()
+        elif self.game_state.current_state != GameStateType.PLAYING:
+            return
+        elif input_type == 'move':
+            player.move(data.get('dx', 0), data.get('dy', 0))
+        elif input_type == 'rotate':
+            player.rotate(data.get('dx', 0), data.get('dy', 0))
+        elif input_type == 'shoot' and player.can_shoot:
+            self._fire(player)
+
+    def _fire(self, player, rewind=0):
+        projectile = player.shoot(play_sound=False)
+        if projectile:
+            projectile.rewind = rewind
+            projectile.projectile_id = self.projectile_id_counter
+            self.projectile_id_counter += 1
+            self.game_state.add_projectile(projectile)
+
+    def _broadcast_snapshot(self):
+        snapshot = self.game_state.serialize()
+        now = pygame.time.get_ticks()
+        snapshot['server_time'] = now
+        for client_id, encoder in self.snapshot_encoders.items():
+            # Each client also learns the last input command applied for it, for reconciliation
+            self.server.send_to_client(client_id, {
+                'type': 'game_state_update',
+                'data': encoder.encode(dict(snapshot, input_seq=self.input_receivers[client_id].last_seq), now)
+            })
+
+
+async def _serve_async(dedicated):
+    if not dedicated.start():
+        return 1
+    try:
+        await dedicated.run_async()
+    finally:
+        dedicated.stop()
+    return 0
+
+
+def run_dedicated_server(port=0, tick_rate=SERVER_TICK_RATE, transport='threads'):
+    init_headless_pygame()
+    if transport == 'asyncio':
+        dedicated = DedicatedServer(port=port, tick_rate=tick_rate, server=AsyncGameServer(port=port))
+    else:
+        dedicated = DedicatedServer(port=port, tick_rate=tick_rate)
+    # SDL swallows SIGTERM into its event queue, which a headless loop never reads
+    signal.signal(signal.SIGTERM, lambda signum, frame: setattr(dedicated, 'running', False))
+    try:
+        if transport == 'asyncio':
+            return asyncio.run(_serve_async(dedicated))
+        if not dedicated.start():
+            return 1
+        dedicated.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dedicated.stop()
+        pygame.quit()
+    return 0
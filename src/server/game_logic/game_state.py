@@ -1,5 +1,7 @@
 from enum import Enum
-from src.config.settings import PLAYING, GAME_OVER, MENU, POINTS_TO_WIN, GAME_TIMER_DURATION
+from src.common.utils.spatial_hash import SpatialHash
+from src.config.settings import (PLAYING, GAME_OVER, MENU, POINTS_TO_WIN, GAME_TIMER_DURATION, RESPAWN_DELAY,
+                                 SPATIAL_HASH_CELL_SIZE, MIN_SPAWN_DISTANCE_FROM_ENEMY, TILE_SIZE)
 
 class GameStateType(Enum):
     MENU = 0
@@ -20,6 +22,11 @@ class GameState:
         self.timer_start_time = 0
         self.timer_duration = GAME_TIMER_DURATION
         self.timer_active = False
+        # Broad-phase index over live players, refreshed by update_spatial_index()
+        self.player_index = SpatialHash(SPATIAL_HASH_CELL_SIZE)
+        # Set by the simulating side when PROJECTILE_ENGINE is 'numpy'; projectiles then live in
+        # its arrays and self.projectiles stays empty
+        self.projectile_system = None
         
     def set_state(self, new_state):
         self.current_state = new_state
@@ -39,8 +46,12 @@ class GameState:
     def remove_player(self, player):
         if player in self.players:
             self.players.remove(player)
+        self.player_index.remove(player)
             
     def add_projectile(self, projectile):
+        if self.projectile_system is not None:
+            self.projectile_system.add(projectile)
+            return
         self.projectiles.append(projectile)
         
     def remove_projectile(self, projectile):
@@ -49,6 +60,29 @@ class GameState:
             
     def get_alive_players(self):
         return [p for p in self.players if p.is_alive]
+    
+    def update_spatial_index(self):
+        """Re-file moved players; called after they move each simulation step."""
+        self.player_index.sync(self.get_alive_players())
+    
+    def update_projectiles(self, dt, hitboxes=None):
+        """Advance projectiles one step, dropping those that expired or hit a wall or player."""
+        if self.projectile_system is not None:
+            import pygame
+            self.projectile_system.update(dt, pygame.time.get_ticks(), self.game_map, self.players,
+                                          self.player_index, hitboxes)
+            return
+        self.projectiles = [p for p in self.projectiles if p.update(dt, self.game_map, self.player_index, hitboxes)]
+    
+    def players_in_rect(self, rect, margin=0):
+        return self.player_index.query_rect(rect, margin)
+    
+    def enemies_near_spawn(self, player, x, y):
+        """Live players other than `player` that could be too close to a spawn at (x, y)."""
+        import pygame
+        reach = (MIN_SPAWN_DISTANCE_FROM_ENEMY + 1) * TILE_SIZE
+        area = pygame.Rect(x - reach, y - reach, 2 * reach + TILE_SIZE, 2 * reach + TILE_SIZE)
+        return [p for p in self.players_in_rect(area) if p is not player]
         
     def check_win_condition(self):
         for player in self.players:
@@ -71,9 +105,8 @@ class GameState:
     def handle_respawn_logic(self):
         for player in self.players:
             if player.is_respawning and player.can_respawn():
-                other_players = [p for p in self.players if p != player and p.is_alive]
-                enemy_player = other_players[0] if other_players else None
-                spawn_pos = self.game_map.find_safe_spawn_position(enemy_player)
+                spawn_pos = self.game_map.find_safe_spawn_position(
+                    nearby_enemies=lambda x, y, player=player: self.enemies_near_spawn(player, x, y))
                 player.respawn(spawn_pos[0], spawn_pos[1])
                 
     def reset(self):
@@ -83,6 +116,8 @@ class GameState:
         self.timer_start_time = 0
         self.timer_active = False
         self.projectiles.clear()
+        if self.projectile_system is not None:
+            self.projectile_system.clear()
         
         for player in self.players:
             player.health = player.max_health if hasattr(player, 'max_health') else 100
@@ -96,6 +131,46 @@ class GameState:
                 player.rect.x = int(player.x)
                 player.rect.y = int(player.y)
     
+    def serialize(self):
+        import pygame
+        game_state = {
+            'players': [],
+            'projectiles': [],
+            'game_status': self.current_state.value,
+            'winner': self.winner.player_id if self.winner else None,
+            'timer_remaining': self.get_remaining_time(),
+            'timer_active': self.timer_active
+        }
+        for player in self.players:
+            respawn_time_remaining = 0
+            if player.is_respawning and player.death_time > 0:
+                elapsed = pygame.time.get_ticks() - player.death_time
+                respawn_time_remaining = max(0, RESPAWN_DELAY - elapsed)
+            game_state['players'].append({
+                'id': player.player_id,
+                'x': player.x,
+                'y': player.y,
+                'angle': player.angle,
+                'health': player.health,
+                'is_alive': player.is_alive,
+                'score': player.score,
+                'is_respawning': player.is_respawning,
+                'respawn_time_remaining': respawn_time_remaining,
+                'spawn_x': player.spawn_x,
+                'spawn_y': player.spawn_y
+            })
+        if self.projectile_system is not None:
+            game_state['projectiles'] = self.projectile_system.serialize()
+        for proj in self.projectiles:
+            game_state['projectiles'].append({
+                'id': proj.projectile_id,
+                'x': proj.x,
+                'y': proj.y,
+                'angle': proj.angle,
+                'owner_id': proj.owner.player_id if proj.owner else None
+            })
+        return game_state
+        
     def start_timer(self, current_time):
         self.timer_start_time = current_time
         self.timer_active = True
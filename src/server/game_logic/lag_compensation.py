@@ -0,0 +1,63 @@
+from src.config.settings import LAG_COMPENSATION_HISTORY, LAG_COMPENSATION_MAX_REWIND
+
+
+class HitboxHistory:
+    """Fixed-size ring buffer of every player's hitbox, one sample per simulation step.
+
+    Shots fired by a remote player carry how far behind the host their view was; their
+    collisions are tested against the hitboxes recorded that long ago instead of the
+    current ones. Times are pygame ticks in milliseconds.
+    """
+
+    def __init__(self, size=LAG_COMPENSATION_HISTORY, max_rewind=LAG_COMPENSATION_MAX_REWIND):
+        self.size = size
+        self.max_rewind = max_rewind
+        self.times = [None] * size
+        self.samples = [None] * size
+        self.head = -1
+
+    def record(self, current_time, players):
+        self.head = (self.head + 1) % self.size
+        self.times[self.head] = current_time
+        self.samples[self.head] = {p.player_id: (p.x, p.y) for p in players}
+
+    def rewind_for(self, view_time, current_time, view_delay=0):
+        """Milliseconds to rewind for a shot fired while viewing the snapshot taken at
+        view_time, drawn view_delay ms behind it by the shooter's interpolation."""
+        if view_time is None:
+            return 0
+        return max(0, min(current_time - view_time + (view_delay or 0), self.max_rewind))
+
+    def rect_at(self, player, target_time):
+        """The player's hitbox at target_time, clamped to the oldest sample kept."""
+        newer = None
+        index = self.head
+        for _ in range(self.size):
+            sample_time = self.times[index]
+            if sample_time is None:
+                break
+            position = self.samples[index].get(player.player_id)
+            if position is None:
+                break
+            if sample_time <= target_time:
+                if newer is not None and newer[0] > sample_time:
+                    t = (target_time - sample_time) / (newer[0] - sample_time)
+                    position = (position[0] + (newer[1][0] - position[0]) * t,
+                                position[1] + (newer[1][1] - position[1]) * t)
+                return self._rect(player, position)
+            newer = (sample_time, position)
+            index = (index - 1) % self.size
+        if newer is None:
+            return player.rect
+        return self._rect(player, newer[1])
+
+    def _rect(self, player, position):
+        rect = player.rect.copy()
+        rect.x = int(position[0])
+        rect.y = int(position[1])
+        return rect
+
+    def clear(self):
+        self.times = [None] * self.size
+        self.samples = [None] * self.size
+        self.head = -1
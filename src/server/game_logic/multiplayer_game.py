@@ -3,8 +3,15 @@ import threading
 from src.common.entities.player import Player
 from src.common.entities.map import Map
 from src.server.game_logic.game_state import GameState, GameStateType
-from src.config.settings import FPS, PLAYER_BLUE, PLAYER_RED
+from src.config.settings import FPS, PLAYER_BLUE, PLAYER_RED, CLIENT_PREDICTION, LAG_COMPENSATION, PROJECTILE_ENGINE
 from src.client.ui.pause_menu import PauseMenu
+from src.network.snapshots import SnapshotEncoder, SnapshotDecoder
+from src.network.input_commands import InputCommandSender, InputCommandReceiver, apply_input_command
+from src.client.prediction import PlayerPredictor
+from src.client.interpolation import SnapshotInterpolator
+from src.server.game_logic.lag_compensation import HitboxHistory
+from src.server.game_logic.projectile_system import create_projectile_system
+from src.common.utils.assets import assets
 
 class MultiplayerGame:
     def __init__(self, mode='host', server=None, client=None):
@@ -19,15 +26,25 @@ class MultiplayerGame:
         self.game_state.set_state(GameStateType.PLAYING)
         self.game_state.game_map = Map()
         self.pause_menu = None
+        self.show_network_overlay = False
         self.network_lock = threading.Lock()
         self.last_network_update = 0
         self.network_update_interval = 1/30
         self.interpolation_enabled = (mode == 'client')
-        self.interpolation_targets = {}
-        self.interpolation_duration = 1/30
-        self.projectile_interpolation = {}
+        self.interpolator = SnapshotInterpolator()
         self.projectile_id_counter = 0
+        self.snapshot_encoder = SnapshotEncoder()
+        self.snapshot_decoder = SnapshotDecoder()
         self._initialize_players()
+        self.input_sender = InputCommandSender(self.local_player_id)
+        self.input_receiver = InputCommandReceiver()
+        self.predictor = None
+        self.hitbox_history = HitboxHistory() if mode == 'host' and LAG_COMPENSATION else None
+        if mode == 'host' and PROJECTILE_ENGINE == 'numpy':
+            self.game_state.projectile_system = create_projectile_system()
+        if mode == 'client' and CLIENT_PREDICTION:
+            self.predictor = PlayerPredictor(self.local_player, self.game_state.game_map,
+                                             self.input_sender.interval)
         if self.client:
             self._setup_client_handlers()
         if self.server and self.mode == 'host':
@@ -41,14 +58,14 @@ class MultiplayerGame:
         blue_spawn = self.game_state.game_map.get_spawn_position(PLAYER_BLUE)
         red_spawn = self.game_state.game_map.get_spawn_position(PLAYER_RED)
         
-        if self.mode == 'host':
-            # Host is always blue (player_id=0)
+        if self.mode == 'host' or (self.client and self.client.assigned_player_id == PLAYER_BLUE):
+            # Host is always blue (player_id=0); a dedicated server may also seat a client as blue
             self.local_player = Player(blue_spawn[0], blue_spawn[1], "player_blue.png", PLAYER_BLUE)
             self.remote_player = Player(red_spawn[0], red_spawn[1], "player_red.png", PLAYER_RED)
             self.local_player_id = PLAYER_BLUE
             self.remote_player_id = PLAYER_RED
         else:
-            # Client is always red (player_id=1)
+            # Client is red (player_id=1) unless a dedicated server assigned blue
             self.local_player = Player(red_spawn[0], red_spawn[1], "player_red.png", PLAYER_RED)
             self.remote_player = Player(blue_spawn[0], blue_spawn[1], "player_blue.png", PLAYER_BLUE)
             self.local_player_id = PLAYER_RED
@@ -56,14 +73,13 @@ class MultiplayerGame:
             
         self.game_state.add_player(self.local_player)
         self.game_state.add_player(self.remote_player)
-        if self.interpolation_enabled:
-            self.interpolation_targets[self.local_player_id] = None
-            self.interpolation_targets[self.remote_player_id] = None
         
     def _setup_server_handlers(self):
         if self.client:
             self.client.register_handler('player_input', self._handle_player_input)
+            self.client.register_handler('input_commands', self._handle_input_commands)
             self.client.register_handler('restart_request', self._handle_restart_request)
+            self.client.register_handler('snapshot_ack', self._handle_snapshot_ack)
         
     def _handle_player_input(self, message):
         if self.mode != 'host':
@@ -101,6 +117,27 @@ class MultiplayerGame:
                         self.projectile_id_counter += 1
                         self.game_state.add_projectile(projectile)
 
+    def _handle_input_commands(self, message):
+        if self.mode != 'host' or message.get('player_id') != self.remote_player_id:
+            return
+        for buttons in self.input_receiver.receive(message):
+            if self.game_state.current_state != GameStateType.PLAYING:
+                continue
+            if apply_input_command(self.remote_player, buttons) and self.remote_player.can_shoot:
+                projectile = self.remote_player.shoot()
+                if projectile:
+                    if self.hitbox_history:
+                        view_time = self.snapshot_encoder.sent_time(message.get('view_seq'))
+                        projectile.rewind = self.hitbox_history.rewind_for(view_time, pygame.time.get_ticks(),
+                                                                           message.get('view_delay'))
+                    projectile.projectile_id = self.projectile_id_counter
+                    self.projectile_id_counter += 1
+                    self.game_state.add_projectile(projectile)
+
+    def _handle_snapshot_ack(self, message):
+        if self.mode == 'host':
+            self.snapshot_encoder.acknowledge(message.get('seq'))
+
     def _handle_restart_request(self, message):
         if self.mode == 'host' and self.game_state.current_state == GameStateType.GAME_OVER:
             self.should_return_to_menu = True
@@ -127,6 +164,12 @@ class MultiplayerGame:
             return
         with self.network_lock:
             data = message.get('data', {})
+            seq = data.get('seq')
+            data = self.snapshot_decoder.decode(data)
+            if data is None:
+                return
+            if seq is not None and self.client:
+                self.client.queue_message({'type': 'snapshot_ack', 'seq': seq})
             if 'game_status' in data:
                 new_state = GameStateType(data['game_status'])
                 current_state = self.game_state.current_state
@@ -146,6 +189,7 @@ class MultiplayerGame:
                     if player.player_id == winner_id:
                         self.game_state.winner = player
                         break
+            interpolate = self.interpolation_enabled and 'server_time' in data
             if 'players' in data:
                 for player_data in data['players']:
                     player_id = player_data.get('id')
@@ -154,9 +198,16 @@ class MultiplayerGame:
                         new_x = player_data.get('x', self.local_player.x)
                         new_y = player_data.get('y', self.local_player.y)
                         new_angle = player_data.get('angle', self.local_player.angle)
-                        if self.interpolation_enabled:
-                            current_time = pygame.time.get_ticks() / 1000.0
-                            self._start_interpolation(player_id, (self.local_player.x, self.local_player.y), (new_x, new_y), current_time)
+                        alive = (player_data.get('is_alive', self.local_player.is_alive) and
+                                 not player_data.get('is_respawning', self.local_player.is_respawning))
+                        if self.predictor and data.get('input_seq') is not None:
+                            # Aim is predicted too; the host's angle only wins while we cannot act
+                            if alive:
+                                self.predictor.reconcile(new_x, new_y, data['input_seq'], pygame.time.get_ticks() / 1000.0)
+                            else:
+                                self.predictor.reset(new_x, new_y)
+                                self.local_player.angle = new_angle
+                        elif interpolate:
                             self.local_player.angle = new_angle
                         else:
                             self.local_player.x = new_x
@@ -182,9 +233,7 @@ class MultiplayerGame:
                         new_x = player_data.get('x', self.remote_player.x)
                         new_y = player_data.get('y', self.remote_player.y)
                         new_angle = player_data.get('angle', self.remote_player.angle)
-                        if self.interpolation_enabled:
-                            current_time = pygame.time.get_ticks() / 1000.0
-                            self._start_interpolation(player_id, (self.remote_player.x, self.remote_player.y), (new_x, new_y), current_time)
+                        if interpolate:
                             self.remote_player.angle = new_angle
                         else:
                             self.remote_player.x = new_x
@@ -207,6 +256,14 @@ class MultiplayerGame:
                             self._update_player_visual_rotation(self.remote_player)
             if 'projectiles' in data:
                 self._sync_projectiles_from_server(data['projectiles'])
+            if interpolate:
+                # Positions are applied from the jitter buffer in _update_interpolation
+                self.interpolator.add(
+                    data['server_time'] / 1000.0,
+                    pygame.time.get_ticks() / 1000.0,
+                    {p['id']: (p['x'], p['y']) for p in data.get('players', []) if 'x' in p},
+                    {p['id']: (p['x'], p['y']) for p in data.get('projectiles', []) if 'x' in p}
+                )
 
     def _handle_return_to_lobby(self, message):
         if self.client:
@@ -227,6 +284,9 @@ class MultiplayerGame:
         
     def process_action(self, action):
         action_type = action.get('type')
+        if action_type == 'toggle_network_overlay':
+            self.show_network_overlay = not self.show_network_overlay
+            return
         
         if self.game_state.current_state == GameStateType.PAUSED and self.pause_menu:
             menu_result = self.pause_menu.handle_input(action)
@@ -298,11 +358,25 @@ class MultiplayerGame:
             elif action_type == 'restart':
                 self.restart()
         else:
-            if action_type in ['move', 'rotate', 'shoot', 'pause', 'resume']:
+            if action_type in ['move', 'rotate', 'shoot']:
+                self.input_sender.add_action(action)
+                if self.predictor and action.get('player') == self.local_player:
+                    self._predict_action(action)
+            elif action_type in ['pause', 'resume']:
                 self._send_input_to_host(action)
             elif action_type == 'restart' and self.game_state.current_state == GameStateType.GAME_OVER:
                 self._send_restart_request_to_host()
             
+    def _predict_action(self, action):
+        with self.network_lock:
+            if action['type'] == 'move':
+                self.local_player.move(action.get('dx', 0), action.get('dy', 0))
+            elif action['type'] == 'rotate':
+                old_angle = self.local_player.angle
+                self.local_player.rotate(action.get('dx', 0), action.get('dy', 0))
+                if old_angle != self.local_player.angle:
+                    self._update_player_visual_rotation(self.local_player)
+
     def _send_input_to_host(self, action):
         if self.client:
             input_data = {
@@ -312,7 +386,7 @@ class MultiplayerGame:
             if action.get('type') in ['move', 'rotate']:
                 input_data['dx'] = action.get('dx', 0)
                 input_data['dy'] = action.get('dy', 0)
-            self.client.send_message({
+            self.client.queue_message({
                 'type': 'player_input',
                 'data': input_data
             })
@@ -358,11 +432,11 @@ class MultiplayerGame:
         if self.game_state.current_state == GameStateType.PLAYING:
             with self.network_lock:
                 for player in self.game_state.players:
-                    player.update(dt, self.game_state.game_map.walls)
-            self.game_state.projectiles = [
-                p for p in self.game_state.projectiles 
-                if p.update(dt, self.game_state.game_map.walls, self.game_state.players)
-            ]
+                    player.update(dt, self.game_state.game_map)
+            if self.hitbox_history:
+                self.hitbox_history.record(current_time, self.game_state.players)
+            self.game_state.update_spatial_index()
+            self.game_state.update_projectiles(dt, self.hitbox_history)
             self.game_state.handle_respawn_logic()
             self.game_state.check_win_condition()
         self._send_network_update()
@@ -377,6 +451,9 @@ class MultiplayerGame:
                 self.should_return_to_menu = True
                 self.quit_to_main_menu = True
                 return
+        if self.predictor and self.game_state.current_state == GameStateType.PLAYING:
+            with self.network_lock:
+                self.local_player.update(min(dt, 0.1), self.game_state.game_map)
         if self.interpolation_enabled:
             self._update_interpolation(current_time / 1000.0)
         self._send_network_update()
@@ -387,52 +464,27 @@ class MultiplayerGame:
             self.last_network_update = current_time
             if self.client:
                 if self.mode == 'host':
-                    game_state_data = self._serialize_game_state()
-                    self.client.send_message({
+                    snapshot = self._serialize_game_state()
+                    snapshot['input_seq'] = self.input_receiver.last_seq
+                    snapshot['server_time'] = pygame.time.get_ticks()
+                    game_state_data = self.snapshot_encoder.encode(snapshot, snapshot['server_time'])
+                    self.client.queue_message({
                         'type': 'game_state_update',
                         'data': game_state_data
                     })
+        if self.mode == 'client' and self.client and self.game_state.current_state == GameStateType.PLAYING:
+            view_delay = self.interpolator.view_lag(current_time) * 1000 if self.interpolation_enabled else 0
+            commands = self.input_sender.poll(current_time, self.snapshot_decoder.latest_seq, view_delay)
+            if commands:
+                self.client.queue_message(commands)
+                if self.predictor:
+                    self.predictor.record(commands['seq'], commands['commands'][-1], current_time)
+        # One flush per frame: this frame's inputs, acks and snapshot share datagrams
+        if self.client:
+            self.client.flush()
                 
     def _serialize_game_state(self):
-        game_state = {
-            'players': [],
-            'projectiles': [],
-            'game_status': self.game_state.current_state.value,
-            'winner': self.game_state.winner.player_id if self.game_state.winner else None,
-            'timer_remaining': self.game_state.get_remaining_time(),
-            'timer_active': self.game_state.timer_active
-        }
-        for player in self.game_state.players:
-            respawn_time_remaining = 0
-            if player.is_respawning and player.death_time > 0:
-                current_time = pygame.time.get_ticks()
-                elapsed = current_time - player.death_time
-                from src.config.settings import RESPAWN_DELAY
-                respawn_time_remaining = max(0, RESPAWN_DELAY - elapsed)
-            player_data = {
-                'id': player.player_id,
-                'x': player.x,
-                'y': player.y,
-                'angle': player.angle,
-                'health': player.health,
-                'is_alive': player.is_alive,
-                'score': player.score,
-                'is_respawning': player.is_respawning,
-                'respawn_time_remaining': respawn_time_remaining,
-                'spawn_x': player.spawn_x,
-                'spawn_y': player.spawn_y
-            }
-            game_state['players'].append(player_data)
-        for proj in self.game_state.projectiles:
-            proj_data = {
-                'id': proj.projectile_id,
-                'x': proj.x,
-                'y': proj.y,
-                'angle': proj.angle,
-                'owner_id': proj.owner.player_id if proj.owner else None
-            }
-            game_state['projectiles'].append(proj_data)
-        return game_state
+        return self.game_state.serialize()
     
     def restart(self):
         self.game_state.reset()
@@ -463,6 +515,31 @@ class MultiplayerGame:
     def get_pause_menu(self):
         return self.pause_menu
 
+    def get_network_overlay(self):
+        if not self.show_network_overlay or not self.client:
+            return None
+        stats = None
+        if self.server:
+            # The host's own client talks to its server over loopback; show the remote player's link
+            for client_id, client_stats in self.server.get_network_stats().items():
+                if client_id != self.client.player_id and client_stats:
+                    stats = client_stats
+        if stats is None:
+            stats = self.client.get_network_stats()
+        rtt = f"{stats['rtt_ms']:.0f} ms" if stats['rtt_ms'] is not None else "--"
+        lines = [
+            f"RTT {rtt}  jitter {stats['jitter_ms']:.1f} ms",
+            f"loss {stats['loss'] * 100:.1f}%",
+            f"in {stats['packets_in_per_s']:.0f} pkt/s {stats['bytes_in_per_s'] / 1000:.1f} kB/s",
+            f"out {stats['packets_out_per_s']:.0f} pkt/s {stats['bytes_out_per_s'] / 1000:.1f} kB/s",
+        ]
+        if self.mode == 'client':
+            lines.append(f"interp delay {self.interpolator.delay * 1000:.0f} ms")
+        usage = assets.memory_usage()
+        lines.append(f"assets {usage['images']} img {usage['image_bytes'] / 1e6:.1f} MB, "
+                     f"{usage['sounds']} snd {usage['sound_bytes'] / 1e6:.1f} MB")
+        return lines
+
     def _sync_projectiles_from_server(self, projectile_data_list):
         from src.common.entities.projectile import Projectile
         existing_projectiles = {}
@@ -470,7 +547,6 @@ class MultiplayerGame:
             if hasattr(proj, 'projectile_id') and proj.projectile_id is not None:
                 existing_projectiles[proj.projectile_id] = proj
         self.game_state.projectiles.clear()
-        current_time = pygame.time.get_ticks() / 1000.0
         for proj_data in projectile_data_list:
             proj_id = proj_data.get('id')
             owner_id = proj_data.get('owner_id')
@@ -491,12 +567,6 @@ class MultiplayerGame:
             )
             if self.interpolation_enabled and proj_id in existing_projectiles:
                 old_proj = existing_projectiles[proj_id]
-                self._start_projectile_interpolation(
-                    proj_id, 
-                    (old_proj.x, old_proj.y), 
-                    (new_x, new_y), 
-                    current_time
-                )
                 projectile.x = old_proj.x
                 projectile.y = old_proj.y
                 projectile.rect.x = int(old_proj.x)
@@ -523,71 +593,23 @@ class MultiplayerGame:
         player.rect.center = old_center
 
     def _update_interpolation(self, current_time):
-        for player_id, interp_data in self.interpolation_targets.items():
-            if interp_data is None:
-                continue
-            elapsed = current_time - interp_data['start_time']
-            progress = min(elapsed / interp_data['duration'], 1.0)
-            player = None
-            if player_id == self.local_player_id:
-                player = self.local_player
-            elif player_id == self.remote_player_id:
-                player = self.remote_player
-            if player is None:
-                continue
-            start_x, start_y = interp_data['start_pos']
-            target_x, target_y = interp_data['target_pos']
-            smooth_progress = self._ease_out_cubic(progress)
-            new_x = start_x + (target_x - start_x) * smooth_progress
-            new_y = start_y + (target_y - start_y) * smooth_progress
-            player.x = new_x
-            player.y = new_y
-            player.rect.x = int(new_x)
-            player.rect.y = int(new_y)
-            if progress >= 1.0:
-                self.interpolation_targets[player_id] = None
-        completed_projectiles = []
-        for proj_id, interp_data in self.projectile_interpolation.items():
-            if interp_data is None:
-                continue
-            elapsed = current_time - interp_data['start_time']
-            progress = min(elapsed / interp_data['duration'], 1.0)
-            projectile = None
-            for proj in self.game_state.projectiles:
-                if hasattr(proj, 'projectile_id') and proj.projectile_id == proj_id:
-                    projectile = proj
-                    break
-            if projectile is None:
-                completed_projectiles.append(proj_id)
-                continue
-            start_x, start_y = interp_data['start_pos']
-            target_x, target_y = interp_data['target_pos']
-            new_x = start_x + (target_x - start_x) * progress
-            new_y = start_y + (target_y - start_y) * progress
-            projectile.x = new_x
-            projectile.y = new_y
-            projectile.rect.x = int(new_x)
-            projectile.rect.y = int(new_y)
-            if progress >= 1.0:
-                completed_projectiles.append(proj_id)
-        for proj_id in completed_projectiles:
-            del self.projectile_interpolation[proj_id]
-    
-    def _ease_out_cubic(self, t):
-        return 1 - pow(1 - t, 3)
-    
-    def _start_interpolation(self, player_id, start_pos, target_pos, current_time):
-        self.interpolation_targets[player_id] = {
-            'start_pos': start_pos,
-            'target_pos': target_pos,
-            'start_time': current_time,
-            'duration': self.interpolation_duration
-        }
-    
-    def _start_projectile_interpolation(self, proj_id, start_pos, target_pos, current_time):
-        self.projectile_interpolation[proj_id] = {
-            'start_pos': start_pos,
-            'target_pos': target_pos,
-            'start_time': current_time,
-            'duration': self.interpolation_duration
-        }
+        with self.network_lock:
+            sampled = self.interpolator.sample(current_time)
+            if sampled is None:
+                return
+            players, projectiles = sampled
+            for player in self.game_state.players:
+                if player is self.local_player and self.predictor:
+                    continue
+                position = players.get(player.player_id)
+                if position is not None:
+                    self._place_entity(player, position)
+            for projectile in self.game_state.projectiles:
+                position = projectiles.get(projectile.projectile_id)
+                if position is not None:
+                    self._place_entity(projectile, position)
+
+    def _place_entity(self, entity, position):
+        entity.x, entity.y = position
+        entity.rect.x = int(entity.x)
+        entity.rect.y = int(entity.y)
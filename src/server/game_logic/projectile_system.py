@@ -0,0 +1,158 @@
+import pygame
+from src.common.entities.map import SOLID
+from src.common.entities.projectile import HALF_SIZE, first_hit
+from src.network.net_log import NetLogger
+from src.config.settings import (PROJECTILE_LIFETIME, PROJECTILE_DAMAGE, PROJECTILE_SYSTEM_CAPACITY, PLAYER_SPEED,
+                                 POINTS_PER_ELIMINATION, TILE_SIZE)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+log = NetLogger('duel.server.projectiles')
+
+NO_OWNER = -1
+
+
+def create_projectile_system(capacity=PROJECTILE_SYSTEM_CAPACITY):
+    """A ProjectileSystem, or None (per-object projectiles) when NumPy is not installed."""
+    if np is None:
+        log.warning("NumPy is not installed; using per-object projectiles")
+        return None
+    return ProjectileSystem(capacity)
+
+
+class ProjectileSystem:
+    """Every live projectile as a row of preallocated NumPy arrays instead of an object.
+
+    update() advances and expires all projectiles in whole-array passes and uses the
+    map's collision grid to pick out the few whose move comes near a wall or a live
+    player. Only those get the swept test of Projectile.update, one by one in spawn
+    order, so hits, kills and scores come out as they would with Projectile objects.
+    Rows are kept in spawn order; the first `count` are live.
+    """
+
+    def __init__(self, capacity=PROJECTILE_SYSTEM_CAPACITY):
+        self.count = 0
+        self._allocate(capacity)
+        self.grid = None
+        self.grid_source = None
+
+    def __len__(self):
+        return self.count
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'x', None)
+        fields = {'x': np.float64, 'y': np.float64, 'vel_x': np.float64, 'vel_y': np.float64,
+                  'angle': np.int64, 'spawn_time': np.int64, 'rewind': np.int64,
+                  'owner_id': np.int64, 'projectile_id': np.int64}
+        for name, dtype in fields.items():
+            array = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, projectile):
+        """Take over a Projectile as made by Player.shoot; the object itself is not kept."""
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        row = self.count
+        self.x[row] = projectile.x
+        self.y[row] = projectile.y
+        self.vel_x[row] = projectile.vel_x
+        self.vel_y[row] = projectile.vel_y
+        self.angle[row] = projectile.angle
+        self.spawn_time[row] = projectile.spawn_time
+        self.rewind[row] = projectile.rewind
+        self.owner_id[row] = projectile.owner.player_id if projectile.owner else NO_OWNER
+        self.projectile_id[row] = projectile.projectile_id if projectile.projectile_id is not None else -1
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def _collision_grid(self, game_map):
+        if self.grid_source is not game_map:
+            self.grid = np.frombuffer(bytes(game_map.collision), dtype=np.uint8).reshape(
+                game_map.height, game_map.width)
+            self.grid_source = game_map
+        return self.grid
+
+    def _solid(self, grid, columns, rows):
+        height, width = grid.shape
+        inside = (columns >= 0) & (columns < width) & (rows >= 0) & (rows < height)
+        solid = np.zeros(len(columns), dtype=bool)
+        solid[inside] = (grid[rows[inside], columns[inside]] & SOLID) != 0
+        return solid
+
+    def update(self, dt, current_time, game_map, players, player_index, hitboxes=None):
+        """Advance every projectile one step and drop those that expire or hit something."""
+        n = self.count
+        if not n:
+            return
+        x, y = self.x[:n], self.y[:n]
+        keep = current_time - self.spawn_time[:n] <= PROJECTILE_LIFETIME
+        start_x, start_y = x + HALF_SIZE, y + HALF_SIZE
+        x += self.vel_x[:n] * dt
+        y += self.vel_y[:n] * dt
+
+        # Box swept by each projectile this step. Moves shorter than a tile keep it within
+        # 2x2 tiles, so its corner tiles tell whether any wall is close enough to matter
+        left = np.minimum(start_x, x + HALF_SIZE) - HALF_SIZE
+        right = np.maximum(start_x, x + HALF_SIZE) + HALF_SIZE
+        top = np.minimum(start_y, y + HALF_SIZE) - HALF_SIZE
+        bottom = np.maximum(start_y, y + HALF_SIZE) + HALF_SIZE
+        check = (right - left >= TILE_SIZE) | (bottom - top >= TILE_SIZE)
+        grid = self._collision_grid(game_map)
+        columns = (np.floor(left / TILE_SIZE).astype(np.int64), np.floor(right / TILE_SIZE).astype(np.int64))
+        rows = (np.floor(top / TILE_SIZE).astype(np.int64), np.floor(bottom / TILE_SIZE).astype(np.int64))
+        for row in rows:
+            for column in columns:
+                check |= self._solid(grid, column, row)
+
+        rewind = self.rewind[:n] if hitboxes is not None else np.zeros(n, dtype=np.int64)
+        # A rewound hitbox can be up to PLAYER_SPEED * rewind behind the player's current rect
+        margin = np.where(rewind > 0, PLAYER_SPEED * rewind // 1000 + 1, 0)
+        for player in players:
+            if player.is_alive:
+                rect = player.rect
+                check |= ((left <= rect.right + margin) & (right >= rect.left - margin) &
+                          (top <= rect.bottom + margin) & (bottom >= rect.top - margin))
+
+        # Only projectiles near a wall or player get the exact swept test, one by one in spawn order
+        by_id = {player.player_id: player for player in players}
+        for row in np.flatnonzero(check & keep).tolist():
+            owner = by_id.get(int(self.owner_id[row]))
+            wall, player = first_hit(game_map, float(start_x[row]), float(start_y[row]),
+                                     float(x[row]) + HALF_SIZE, float(y[row]) + HALF_SIZE,
+                                     player_index, owner, hitboxes, int(rewind[row]), current_time)
+            if player:
+                player.take_damage(PROJECTILE_DAMAGE)
+                if not player.is_alive and owner:
+                    owner.add_score(POINTS_PER_ELIMINATION)
+            if wall or player:
+                keep[row] = False
+
+        live = int(np.count_nonzero(keep))
+        if live != n:
+            for array in (self.x, self.y, self.vel_x, self.vel_y, self.angle, self.spawn_time,
+                          self.rewind, self.owner_id, self.projectile_id):
+                array[:live] = array[:n][keep]
+            self.count = live
+
+    def serialize(self):
+        """Snapshot entries in the same form as GameState.serialize gives for Projectile objects."""
+        n = self.count
+        return [{'id': projectile_id if projectile_id >= 0 else None, 'x': x, 'y': y, 'angle': angle,
+                 'owner_id': owner_id if owner_id != NO_OWNER else None}
+                for projectile_id, x, y, angle, owner_id in zip(
+                    self.projectile_id[:n].tolist(), self.x[:n].tolist(), self.y[:n].tolist(),
+                    self.angle[:n].tolist(), self.owner_id[:n].tolist())]
+
+    def draw(self, screen):
+        n = self.count
+        for left, top in zip(np.trunc(self.x[:n]).astype(np.int64).tolist(),
+                             np.trunc(self.y[:n]).astype(np.int64).tolist()):
+            pygame.draw.circle(screen, (0, 0, 0), (left + HALF_SIZE, top + HALF_SIZE), 3)
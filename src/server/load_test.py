@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import math
+import multiprocessing
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from src.network.socket_server import GameServer
+from src.network.async_transport import AsyncGameClient
+from src.network.input_commands import InputCommandSender
+from src.network.snapshots import SnapshotEncoder
+from src.network.net_log import configure_logging
+from src.config.settings import (INPUT_SEND_RATE, SERVER_SNAPSHOT_RATE, LOAD_TEST_REPORT_INTERVAL,
+                                 LOAD_TEST_PING_INTERVAL, LOAD_TEST_LATENCY_SAMPLES)
+
+# Bots number their pings from here so their pongs are not confused with the client's own ping stream
+BOT_PING_SEQ_BASE = 0x80000000
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class InstrumentedGameServer(GameServer):
+    """GameServer that times how long each received datagram takes to process."""
+
+    def __init__(self, host=None, port=0):
+        super().__init__(host, port)
+        self.packets = 0
+        self.process_times = deque(maxlen=LOAD_TEST_LATENCY_SAMPLES)
+
+    def _process_datagram(self, data, address):
+        start = time.perf_counter()
+        super()._process_datagram(data, address)
+        self.process_times.append(time.perf_counter() - start)
+        self.packets += 1
+
+
+def _serve(index, kind, ready_queue, stats_queue, stop_event):
+    server = InstrumentedGameServer(port=0)
+    dedicated = None
+    if kind == 'dedicated':
+        from src.server.dedicated_server import DedicatedServer, init_headless_pygame
+        init_headless_pygame()
+        dedicated = DedicatedServer(server=server)
+        dedicated.start()
+        threading.Thread(target=dedicated.run, daemon=True).start()
+    else:
+        server.start()
+    ready_queue.put((index, server.port))
+    cpu_start = time.process_time()
+    try:
+        while not stop_event.wait(LOAD_TEST_REPORT_INTERVAL):
+            samples = list(server.process_times)
+            server.process_times.clear()
+            stats_queue.put({
+                'server': index,
+                'cpu': time.process_time() - cpu_start,
+                'packets': server.packets,
+                'ticks': dedicated.tick_count if dedicated else 0,
+                'clients': len(server.client_rooms),
+                'process_times': samples
+            })
+    finally:
+        if dedicated:
+            dedicated.stop()
+        else:
+            server.stop()
+
+
+class LoadResults:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.dropped = 0
+        self.sent = 0
+        self.received = 0
+        self.rtts = deque(maxlen=LOAD_TEST_LATENCY_SAMPLES)
+
+
+class Bot:
+    """Headless client: connect, play with random input for `duration` seconds, disconnect.
+
+    A bot in the 'host' role streams synthetic snapshots into its room the way a
+    hosting MultiplayerGame does; 'client' bots send input commands and acknowledge
+    the snapshots they receive.
+    """
+
+    def __init__(self, index, address, room, role, duration, results, rng):
+        self.index = index
+        self.address = address
+        self.room = room
+        self.role = role
+        self.duration = duration
+        self.results = results
+        self.rng = rng
+        self.client = AsyncGameClient()
+        self.ping_seq = BOT_PING_SEQ_BASE
+        # seq -> send time of the bot's pings still awaiting a pong
+        self.ping_times = {}
+
+    async def run(self):
+        client = self.client
+        client.register_handler('pong', self._on_pong)
+        client.register_handler('game_state_update', self._on_snapshot)
+        client.register_handler('input_commands', self._on_message)
+        if not await client.connect_async(self.address[0], self.address[1], self.room):
+            self.results.failed += 1
+            return
+        self.results.connected += 1
+        sender = InputCommandSender(client.player_id or 0)
+        encoder = SnapshotEncoder()
+        interval = 1.0 / max(INPUT_SEND_RATE, SERVER_SNAPSHOT_RATE)
+        end_time = time.monotonic() + self.duration
+        next_ping = 0
+        while time.monotonic() < end_time and not client.connection_lost:
+            now = time.monotonic()
+            if now >= next_ping:
+                next_ping = now + LOAD_TEST_PING_INTERVAL
+                self.ping_seq += 1
+                # Pings whose pong never came are forgotten after a few seconds
+                self.ping_times = {seq: sent for seq, sent in self.ping_times.items() if now - sent < 10.0}
+                self.ping_times[self.ping_seq] = now
+                self._send({'type': 'ping', 'seq': self.ping_seq})
+            if self.role == 'host':
+                self._send({'type': 'game_state_update', 'data': encoder.encode(self._fake_snapshot())})
+            else:
+                sender.add_action({'type': 'move', 'dx': self.rng.choice((-1, 0, 1)), 'dy': self.rng.choice((-1, 0, 1))})
+                if self.rng.random() < 0.1:
+                    sender.add_action({'type': 'shoot'})
+                commands = sender.poll(now)
+                if commands:
+                    self._send(commands)
+            client.flush()
+            await asyncio.sleep(interval)
+        if client.connection_lost:
+            self.results.dropped += 1
+        client.disconnect()
+
+    def _send(self, message):
+        self.client.queue_message(message)
+        self.results.sent += 1
+
+    def _fake_snapshot(self):
+        players = [{'id': pid, 'x': self.rng.uniform(0, 800), 'y': self.rng.uniform(0, 600), 'angle': 0,
+                    'health': 100, 'is_alive': True, 'score': 0} for pid in (0, 1)]
+        projectiles = [{'id': i, 'x': self.rng.uniform(0, 800), 'y': self.rng.uniform(0, 600), 'angle': 90,
+                        'owner_id': 0} for i in range(self.rng.randint(0, 10))]
+        return {'players': players, 'projectiles': projectiles, 'game_status': 1}
+
+    def _on_pong(self, message):
+        self.results.received += 1
+        sent = self.ping_times.pop(message.get('seq'), None)
+        if sent is not None:
+            self.results.rtts.append(time.monotonic() - sent)
+
+    def _on_snapshot(self, message):
+        self.results.received += 1
+        seq = message.get('data', {}).get('seq')
+        if seq is not None and self.role == 'client':
+            self.client.queue_message({'type': 'snapshot_ack', 'seq': seq})
+
+    def _on_message(self, message):
+        self.results.received += 1
+
+
+async def _run_bots(addresses, bot_count, duration, ramp, kind, seed):
+    results = LoadResults()
+    rng = random.Random(seed)
+    tasks = []
+    for index in range(bot_count):
+        pair = index // 2
+        address = addresses[pair % len(addresses)]
+        # Dedicated servers host one match each; relays get a room per pair of bots
+        room = None if kind == 'dedicated' else f"B{pair:05d}"
+        role = 'host' if kind == 'relay' and index % 2 == 0 else 'client'
+        bot = Bot(index, address, room, role, duration, results, random.Random(rng.random()))
+        tasks.append(asyncio.ensure_future(bot.run()))
+        if ramp:
+            await asyncio.sleep(ramp / bot_count)
+    await asyncio.gather(*tasks)
+    return results
+
+
+def run_load_test(bot_count=100, duration=30.0, servers=None, kind='relay', targets=None, ramp=2.0, seed=None):
+    """Run bots against `targets` or against `servers` freshly spawned local servers and print a report.
+
+    A dedicated server seats exactly two players, so by default one is spawned per pair of
+    bots; asking for more bots than the dedicated servers can seat raises ValueError.
+    """
+    if servers is None:
+        servers = math.ceil(bot_count / 2) if kind == 'dedicated' else 1
+    if kind == 'dedicated' and bot_count > 2 * len(targets or range(servers)):
+        raise ValueError(f"{bot_count} bots need at least {math.ceil(bot_count / 2)} dedicated servers")
+    processes = []
+    context = multiprocessing.get_context('fork')
+    stats_queue = context.Queue()
+    stop_event = context.Event()
+    if targets:
+        addresses = targets
+    else:
+        ready_queue = context.Queue()
+        for index in range(servers):
+            process = context.Process(target=_serve, args=(index, kind, ready_queue, stats_queue, stop_event),
+                                      daemon=True)
+            process.start()
+            processes.append(process)
+        ports = dict(ready_queue.get(timeout=10.0) for _ in range(servers))
+        addresses = [('127.0.0.1', ports[index]) for index in range(servers)]
+
+    start = time.monotonic()
+    try:
+        results = asyncio.run(_run_bots(addresses, bot_count, duration, ramp, kind, seed))
+    finally:
+        elapsed = time.monotonic() - start
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=5.0)
+
+    server_stats = {}
+    process_times = []
+    while True:
+        try:
+            stats = stats_queue.get_nowait()
+        except queue.Empty:
+            break
+        process_times.extend(stats['process_times'])
+        server_stats[stats['server']] = stats
+    report = {
+        'bots': bot_count,
+        'connected': results.connected,
+        'failed': results.failed,
+        'dropped': results.dropped,
+        'bot_sent_per_s': results.sent / elapsed,
+        'bot_received_per_s': results.received / elapsed,
+        'rtt_p50_ms': percentile(results.rtts, 0.50) * 1000,
+        'rtt_p99_ms': percentile(results.rtts, 0.99) * 1000,
+    }
+    if server_stats:
+        cpu = sum(s['cpu'] for s in server_stats.values())
+        packets = sum(s['packets'] for s in server_stats.values())
+        ticks = sum(s['ticks'] for s in server_stats.values())
+        report.update({
+            'server_cpu_percent': 100.0 * cpu / elapsed,
+            'server_packets_per_s': packets / elapsed,
+            'server_cpu_us_per_packet': 1e6 * cpu / packets if packets else 0.0,
+            'process_p50_us': percentile(process_times, 0.50) * 1e6,
+            'process_p99_us': percentile(process_times, 0.99) * 1e6,
+        })
+        if ticks:
+            report['server_cpu_ms_per_tick'] = 1e3 * cpu / ticks
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress a game server with headless bot clients")
+    parser.add_argument('--bots', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds each bot plays")
+    parser.add_argument('--servers', type=int,
+                        help="Local servers to spawn when no --target is given "
+                             "(default 1 relay, or one dedicated server per pair of bots)")
+    parser.add_argument('--kind', choices=('relay', 'dedicated'), default='relay',
+                        help="Spawn room relays (GameServer) or dedicated simulation servers (two bots each)")
+    parser.add_argument('--target', action='append', help="Existing server as host:port (repeatable)")
+    parser.add_argument('--ramp', type=float, default=2.0, help="Seconds over which bots connect")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    configure_logging()
+    targets = None
+    if args.target:
+        targets = [(host, int(port)) for host, port in (t.rsplit(':', 1) for t in args.target)]
+    if args.kind == 'dedicated':
+        seats = 2 * (len(targets) if targets else args.servers or math.ceil(args.bots / 2))
+        if args.bots > seats:
+            parser.error(f"--kind dedicated seats two bots per server; {args.bots} bots need "
+                         f"{math.ceil(args.bots / 2)} servers but only {seats // 2} were given")
+    report = run_load_test(args.bots, args.duration, args.servers, args.kind, targets, args.ramp, args.seed)
+    width = max(len(key) for key in report)
+    for key, value in report.items():
+        print(f"{key:<{width}}  {value:.2f}" if isinstance(value, float) else f"{key:<{width}}  {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
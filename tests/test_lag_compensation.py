@@ -0,0 +1,68 @@
+import pygame
+from src.client.interpolation import SnapshotInterpolator
+from src.network.input_commands import InputCommandSender, SHOOT
+from src.network.protocol import encode_message, decode_message
+from src.network.snapshots import SnapshotEncoder
+from src.server.game_logic.lag_compensation import HitboxHistory
+
+
+class Target:
+    def __init__(self, player_id=1):
+        self.player_id = player_id
+        self.x = 0.0
+        self.y = 0.0
+        self.rect = pygame.Rect(0, 0, 48, 48)
+
+
+def test_rewind_includes_view_delay_and_is_clamped():
+    history = HitboxHistory(max_rewind=250)
+    assert history.rewind_for(None, 1000, 80) == 0
+    assert history.rewind_for(900, 1000) == 100
+    assert history.rewind_for(900, 1000, 80) == 180
+    assert history.rewind_for(900, 1000, 200) == 250
+
+
+def test_view_lag_tracks_interpolation_delay():
+    interpolator = SnapshotInterpolator()
+    for step in range(10):
+        interpolator.add(step / 30, step / 30 + 0.05, {1: (step, 0)}, {})
+    # Sampled right as the newest snapshot arrives, the view is a full delay behind it
+    assert abs(interpolator.view_lag(9 / 30 + 0.05) - interpolator.delay) < 1e-9
+    assert interpolator.view_lag(100.0) == 0.0
+    assert SnapshotInterpolator().view_lag(1.0) == 0.0
+
+
+def test_view_delay_survives_the_wire():
+    sender = InputCommandSender(1)
+    sender.add_action({'type': 'shoot'})
+    message = decode_message(encode_message(sender.poll(0.0, view_seq=7, view_delay=120.6)))
+    assert message['view_seq'] == 7
+    assert message['view_delay'] == 120
+    assert message['commands'][-1] & SHOOT
+    # No delay (or no snapshot yet) leaves the field out
+    assert 'view_delay' not in sender.poll(1.0, view_seq=8, view_delay=0)
+    assert 'view_delay' not in sender.poll(2.0, view_delay=50)
+
+
+def test_shot_from_delayed_view_hits_where_the_shooter_saw_the_target():
+    history = HitboxHistory(max_rewind=250)
+    encoder = SnapshotEncoder()
+    target = Target()
+    view_seq = None
+    # The target walks right 3 px per 10 ms; snapshot 1 goes out at t=1000
+    for current_time in range(800, 1101, 10):
+        target.x = (current_time - 800) * 0.3
+        history.record(current_time, [target])
+        if current_time == 1000:
+            view_seq = encoder.encode({'players': []}, current_time)['seq']
+    target.rect.x = int(target.x)
+    current_time = 1100
+    view_delay = 150
+    # The shooter had snapshot view_seq but drew the target view_delay ms behind it
+    rewind = history.rewind_for(encoder.sent_time(view_seq), current_time, view_delay)
+    assert rewind == 250
+    seen = history.rect_at(target, current_time - rewind)
+    assert seen.x == int((850 - 800) * 0.3)
+    # Ignoring the delay would test against a hitbox 45 px too far along
+    too_new = history.rect_at(target, current_time - history.rewind_for(encoder.sent_time(view_seq), current_time))
+    assert too_new.x - seen.x == 45
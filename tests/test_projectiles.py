@@ -0,0 +1,32 @@
+import pygame
+from src.common.entities.projectile import first_hit
+from src.common.utils.spatial_hash import SpatialHash
+
+
+class OpenMap:
+    def sweep(self, x0, y0, x1, y1, half_size, flags):
+        return None
+
+
+class Target:
+    def __init__(self, x, y):
+        self.rect = pygame.Rect(x, y, 48, 48)
+        self.is_alive = True
+
+
+def test_long_step_hits_the_first_player_along_the_path():
+    near, far, beside = Target(400, 100), Target(900, 100), Target(600, 300)
+    index = SpatialHash(64)
+    index.sync([far, beside, near])
+    assert first_hit(OpenMap(), 0, 120, 1200, 120, index, None) == (None, near)
+    # The owner is never hit by its own projectile
+    assert first_hit(OpenMap(), 0, 120, 1200, 120, index, near) == (None, far)
+
+
+def test_projectile_grazing_a_player_within_its_half_size_hits():
+    target = Target(400, 100)
+    index = SpatialHash(64)
+    index.sync([target])
+    # The projectile's centre passes 2 px above the hitbox, inside its 3 px half size
+    assert first_hit(OpenMap(), 0, 98, 1200, 98, index, None) == (None, target)
+    assert first_hit(OpenMap(), 0, 96, 1200, 96, index, None) == (None, None)
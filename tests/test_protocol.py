@@ -0,0 +1,68 @@
+from src.network.protocol import encode_message, decode_message, JSON_TYPE_ID, PLAYER_STATE, PROJECTILE_STATE
+
+
+def round_trip(record, value):
+    out = bytearray()
+    record.encode(value, out)
+    decoded, offset = record.decode(bytes(out), 0)
+    assert offset == len(out)
+    return decoded
+
+
+def full_player(**changes):
+    player = {'id': 1, 'x': 64.0, 'y': 512.5, 'angle': 315, 'health': 100, 'is_alive': True, 'score': 3,
+              'is_respawning': False, 'respawn_time_remaining': 0, 'spawn_x': 64.0, 'spawn_y': 64.0}
+    player.update(changes)
+    return player
+
+
+def test_player_state_round_trip():
+    player = full_player()
+    assert round_trip(PLAYER_STATE, player) == player
+    # A delta only carries the fields that changed
+    assert round_trip(PLAYER_STATE, {'id': 1, 'x': 70.0625}) == {'id': 1, 'x': 70.0625}
+
+
+def test_player_state_boundaries():
+    top = 3072.0 - 1 / 16
+    player = full_player(id=15, x=-1024.0, y=top, angle=0, health=0, score=0xFFFF,
+                         respawn_time_remaining=0xFFFF, spawn_x=top, spawn_y=-1024.0)
+    assert round_trip(PLAYER_STATE, player) == player
+
+
+def test_player_state_clamps_out_of_range_values():
+    player = full_player(x=-2000.0, y=5000.0, health=-5, score=70000, respawn_time_remaining=100000)
+    decoded = round_trip(PLAYER_STATE, player)
+    assert decoded['x'] == -1024.0
+    assert decoded['y'] == 3072.0 - 1 / 16
+    assert decoded['health'] == 0
+    assert decoded['score'] == 0xFFFF
+    assert decoded['respawn_time_remaining'] == 0xFFFF
+
+
+def test_projectile_state_round_trip_and_boundaries():
+    projectile = {'id': 0xFFFFFFFF, 'x': -1024.0, 'y': 3072.0 - 1 / 16, 'angle': 225, 'owner_id': 15}
+    assert round_trip(PROJECTILE_STATE, projectile) == projectile
+    assert round_trip(PROJECTILE_STATE, {'id': 0, 'x': 12.25}) == {'id': 0, 'x': 12.25}
+    assert round_trip(PROJECTILE_STATE, {'id': 7, 'x': 9999.0})['x'] == 3072.0 - 1 / 16
+
+
+def test_snapshot_with_off_map_position_stays_binary():
+    message = {'type': 'game_state_update',
+               'data': {'seq': 5, 'players': [full_player(x=4000.0)],
+                        'projectiles': [{'id': 9, 'x': -1500.0, 'y': 80.0, 'angle': 90, 'owner_id': 1}]}}
+    data = encode_message(message)
+    assert data[1] != JSON_TYPE_ID
+    decoded = decode_message(data)['data']
+    assert decoded['players'][0]['x'] == 3072.0 - 1 / 16
+    assert decoded['projectiles'][0]['x'] == -1024.0
+
+
+def test_unencodable_field_falls_back_to_json_with_warning(caplog):
+    message = {'type': 'game_state_update',
+               'data': {'seq': 5, 'players': [full_player(id=16)], 'projectiles': []}}
+    with caplog.at_level('WARNING', logger='duel.network.protocol'):
+        data = encode_message(message)
+    assert data[1] == JSON_TYPE_ID
+    assert decode_message(data) == message
+    assert "'id'" in caplog.text